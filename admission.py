@@ -0,0 +1,156 @@
+import math
+import time
+import threading
+from contextlib import contextmanager
+from concurrent.futures import Future
+
+
+class AdmissionRejected(Exception):
+    """Raised when a queue is full; the request should be retried after retry_after seconds"""
+
+    def __init__(self, name, retry_after):
+        self.name = name
+        self.retry_after = retry_after
+        super().__init__(f"Too many concurrent {name} requests; retry in {retry_after}s")
+
+
+class _Timing:
+    """Moving average of how long admitted work takes, used for Retry-After"""
+
+    def __init__(self, default_seconds):
+        self.average_seconds = None
+        self.default_seconds = default_seconds
+
+    def record(self, seconds):
+        if self.average_seconds is None:
+            self.average_seconds = seconds
+        else:
+            self.average_seconds = 0.8 * self.average_seconds + 0.2 * seconds
+
+    def retry_after(self, queued, slots=1):
+        average = self.average_seconds or self.default_seconds
+        return max(1, math.ceil(average * (queued + 1) / slots))
+
+
+class ConcurrencyLimiter:
+    """At most `limit` callers run at once, at most `max_queue` wait, and none waits longer than `timeout`"""
+
+    def __init__(self, name, limit, max_queue, timeout=30.0):
+        self.name = name
+        self.limit = limit
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.timing = _Timing(default_seconds=2.0)
+        self._condition = threading.Condition()
+
+    def _reject(self):
+        self.rejected += 1
+        raise AdmissionRejected(self.name, self.timing.retry_after(self.waiting, self.limit))
+
+    @contextmanager
+    def slot(self, blocking=False):
+        """Hold one slot; blocking=True waits indefinitely and ignores the queue bound (background work)"""
+        with self._condition:
+            if self.active >= self.limit:
+                if not blocking and self.waiting >= self.max_queue:
+                    self._reject()
+                self.waiting += 1
+                try:
+                    admitted = self._condition.wait_for(lambda: self.active < self.limit,
+                                                        None if blocking else self.timeout)
+                finally:
+                    self.waiting -= 1
+                if not admitted:
+                    self._reject()
+            self.active += 1
+            self.admitted += 1
+
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._condition:
+                self.timing.record(time.perf_counter() - start_time)
+                self.active -= 1
+                self._condition.notify()
+
+    def stats(self):
+        with self._condition:
+            return {
+                'limit': self.limit,
+                'active': self.active,
+                'queue_depth': self.waiting,
+                'max_queue': self.max_queue,
+                'admitted': self.admitted,
+                'rejected': self.rejected,
+                'average_seconds': self.timing.average_seconds
+            }
+
+
+class RunCoalescer:
+    """Runs one job at a time; callers with the same key as a queued or running job share its result.
+
+    A caller whose key differs (e.g. the corpus changed since the running job
+    started) queues a new run behind it. At most max_pending callers, whether
+    they start a run or share one, may be waiting before new ones are rejected.
+    """
+
+    def __init__(self, name, max_pending):
+        self.name = name
+        self.max_pending = max_pending
+        self.pending = 0
+        self.runs = 0
+        self.coalesced = 0
+        self.rejected = 0
+        self.inflight = {}
+        self.timing = _Timing(default_seconds=10.0)
+        self._lock = threading.Lock()
+        self._run_lock = threading.Lock()
+
+    def run(self, key, job):
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise AdmissionRejected(self.name, self.timing.retry_after(len(self.inflight)))
+            future = self.inflight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self.inflight[key] = future
+            else:
+                self.coalesced += 1
+            self.pending += 1
+
+        try:
+            if leader:
+                with self._run_lock:
+                    start_time = time.perf_counter()
+                    try:
+                        future.set_result(job())
+                    except Exception as e:
+                        future.set_exception(e)
+                    finally:
+                        self.timing.record(time.perf_counter() - start_time)
+                        with self._lock:
+                            self.inflight.pop(key, None)
+                            self.runs += 1
+            return future.result()
+        finally:
+            with self._lock:
+                self.pending -= 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'queue_depth': self.pending,
+                'max_pending': self.max_pending,
+                'runs_queued_or_running': len(self.inflight),
+                'runs': self.runs,
+                'coalesced': self.coalesced,
+                'rejected': self.rejected,
+                'average_seconds': self.timing.average_seconds
+            }
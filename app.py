@@ -1,6 +1,10 @@
-from flask import Flask, render_template, request, jsonify, redirect, url_for
+from flask import Flask, render_template, request, jsonify, redirect, url_for, send_file
 import os
 import json
+import time
+import uuid
+import hashlib
+import threading
 from datetime import datetime
 from werkzeug.utils import secure_filename
 import PyPDF2
@@ -13,19 +17,81 @@ import pickle
 import re
 from collections import defaultdict
 from contract_analyzer import AdvancedContractAnalyzer
+from pdf_backends import PDFExtractionError, extract_document
+from sharding import ShardCoordinator
+from watcher import UploadWatcher
+from report_exports import ReportExporter, EXPORT_FORMATS
+from results_view import ResultsView
+from admission import AdmissionRejected, ConcurrencyLimiter, RunCoalescer
+from response_cache import ResponseCache
 
 app = Flask(__name__)
 app.config['UPLOAD_FOLDER'] = 'uploads'
-app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
+app.config['MAX_CONTENT_LENGTH'] = int(os.environ.get('MAX_CONTENT_LENGTH', 512 * 1024 * 1024))  # 512MB default
+app.config['UPLOAD_CHUNK_SIZE'] = 1024 * 1024  # 1MB read/write blocks
+app.config['PARTIAL_UPLOAD_FOLDER'] = 'uploads/.partial'
+# Chunked uploads with no activity for this long are discarded
+app.config['CHUNKED_UPLOAD_TTL_SECONDS'] = int(os.environ.get('CHUNKED_UPLOAD_TTL_SECONDS', 24 * 3600))
+# 'off' analyses in-process; 'process' fans counterparty shards out to worker processes
+app.config['SHARDED_ANALYSIS'] = os.environ.get('SHARDED_ANALYSIS', 'off')
+# Seconds between renewal alert ticks; 0 disables the background scheduler
+app.config['RENEWAL_TICK_SECONDS'] = int(os.environ.get('RENEWAL_TICK_SECONDS', 3600))
+# Ingest PDFs dropped into the upload folders (e.g. by the document management export)
+app.config['WATCH_UPLOADS'] = os.environ.get('WATCH_UPLOADS', '0').lower() in ('1', 'true', 'yes')
+app.config['WATCH_BACKEND'] = os.environ.get('WATCH_BACKEND', 'auto')  # auto | inotify | polling
+app.config['WATCH_DEBOUNCE_SECONDS'] = float(os.environ.get('WATCH_DEBOUNCE_SECONDS', 2))
+app.config['WATCH_WORKERS'] = int(os.environ.get('WATCH_WORKERS', 2))
+# Portfolio PDF/XLSX/DOCX exports are rendered in the background after each analysis
+app.config['EXPORT_PRERENDER'] = os.environ.get('EXPORT_PRERENDER', '1').lower() in ('1', 'true', 'yes')
+app.config['EXPORT_WORKERS'] = int(os.environ.get('EXPORT_WORKERS', 2))
+# Admission control: concurrent PDF parses, how many may queue (and for how long), queued analyses
+app.config['PDF_PARSE_CONCURRENCY'] = int(os.environ.get('PDF_PARSE_CONCURRENCY', 4))
+app.config['PDF_PARSE_QUEUE'] = int(os.environ.get('PDF_PARSE_QUEUE', 8))
+app.config['PDF_PARSE_WAIT_SECONDS'] = float(os.environ.get('PDF_PARSE_WAIT_SECONDS', 30))
+app.config['ANALYZE_MAX_PENDING'] = int(os.environ.get('ANALYZE_MAX_PENDING', 4))
+# Encoded /analyze and /results responses kept per corpus version (0 disables)
+app.config['RESPONSE_CACHE_SIZE'] = int(os.environ.get('RESPONSE_CACHE_SIZE', 64))
 
 # Ensure upload directories exist
 os.makedirs('uploads/azure-nadcomms', exist_ok=True)
 os.makedirs('uploads/nadcomms-customerA', exist_ok=True)
 os.makedirs('uploads/nadcomms-customerB', exist_ok=True)
 os.makedirs('uploads/nadcomms-customerC', exist_ok=True)
+os.makedirs('uploads/.partial', exist_ok=True)
 os.makedirs('models', exist_ok=True)
 os.makedirs('analysis_results', exist_ok=True)
 
+# Determine upload folder based on contract type
+UPLOAD_FOLDER_MAP = {
+    'azure-nadcomms': 'uploads/azure-nadcomms',
+    'nadcomms-customerA': 'uploads/nadcomms-customerA',
+    'nadcomms-customerB': 'uploads/nadcomms-customerB',
+    'nadcomms-customerC': 'uploads/nadcomms-customerC'
+}
+
+# Serialises analyzer updates between request threads and the upload watcher
+ingest_lock = threading.Lock()
+upload_watcher = None
+
+# Upload parsing is capped; repeated /analyze calls for the same corpus share one run
+pdf_parse_slots = ConcurrencyLimiter('PDF parse', app.config['PDF_PARSE_CONCURRENCY'],
+                                     app.config['PDF_PARSE_QUEUE'], app.config['PDF_PARSE_WAIT_SECONDS'])
+analysis_runs = RunCoalescer('analysis', app.config['ANALYZE_MAX_PENDING'])
+
+# Rendered report exports, cached on disk per analysis run
+report_exporter = ReportExporter(max_workers=app.config['EXPORT_WORKERS'])
+
+# Summary and per-contract pages of the latest saved analysis for the results view
+results_view = ResultsView()
+
+# Responses for an unchanged corpus are served from memory until a contract is added or removed
+response_cache = ResponseCache(app.config['RESPONSE_CACHE_SIZE'])
+
+# In-progress chunked uploads: upload_id -> {'received': bytes, 'hasher': sha256, 'lock': ...}.
+# Each has a .part file and a .json sidecar in PARTIAL_UPLOAD_FOLDER, so it can resume after a restart.
+chunked_uploads = {}
+chunked_uploads_lock = threading.Lock()
+
 class ContractAnalyzer:
     def __init__(self):
         self.contracts = {}
@@ -165,75 +231,444 @@ class ContractAnalyzer:
 
 # Initialize advanced analyzer
 analyzer = AdvancedContractAnalyzer()
+# Each worker maps the saved model arrays instead of unpickling its own copy
+analyzer.load_shared_model()
+if app.config['RENEWAL_TICK_SECONDS'] > 0:
+    analyzer.renewal_scheduler.start(app.config['RENEWAL_TICK_SECONDS'])
+
+@app.errorhandler(AdmissionRejected)
+def admission_rejected(e):
+    response = jsonify({'error': str(e), 'retry_after': e.retry_after})
+    response.headers['Retry-After'] = str(e.retry_after)
+    return response, 429
+
+@app.route('/metrics')
+def admission_metrics():
+    """Queue depth, concurrency and rejections for PDF parsing and analysis runs, plus response cache hits"""
+    return jsonify({
+        'pdf_parse': pdf_parse_slots.stats(),
+        'analysis': analysis_runs.stats(),
+        'response_cache': dict(response_cache.stats(), corpus_version=analyzer.corpus_version)
+    })
 
 @app.route('/')
 def index():
     return render_template('index.html')
 
+def stream_to_disk(stream, filepath, hasher=None, mode='wb'):
+    """Copy a stream to disk in fixed-size blocks, updating a SHA-256 hash as it goes"""
+    hasher = hasher or hashlib.sha256()
+    size = 0
+    chunk_size = app.config['UPLOAD_CHUNK_SIZE']
+    with open(filepath, mode) as out:
+        while True:
+            chunk = stream.read(chunk_size)
+            if not chunk:
+                break
+            hasher.update(chunk)
+            out.write(chunk)
+            size += len(chunk)
+    return hasher, size
+
+def register_contract(filepath, filename, contract_type, sha256, size_bytes, extracted=None):
+    """Extract text and terms from a saved PDF and add it to the analyzer.
+    
+    Exact and near-duplicate uploads are linked to the existing contract
+    rather than parsed for terms and analysed again. `extracted` is a
+    (text, pdf_stats) pair when text extraction already ran elsewhere.
+    """
+    contract_id = f"{contract_type}_{filename}"
+    metadata = {
+        'filename': filename,
+        'contract_type': contract_type,
+        'upload_date': datetime.now().isoformat(),
+        'customer': contract_type.split('-')[-1] if 'customer' in contract_type else None,
+        'sha256': sha256,
+        'size_bytes': size_bytes
+    }
+    
+    # Exact duplicates are caught before paying for text extraction. Each lookup is
+    # repeated under the lock that registers the result, so a concurrent upload or
+    # the watcher cannot register the same file in between.
+    text, pdf_stats = extracted if extracted is not None else (None, None)
+    while True:
+        with ingest_lock:
+            duplicate = analyzer.find_duplicate(sha256, text, contract_type)
+            if duplicate and duplicate['duplicate_of'] != contract_id:
+                analyzer.link_duplicate(contract_id, duplicate, metadata)
+                return contract_id, duplicate
+            if duplicate and duplicate['match'] == 'exact':
+                # Same file re-uploaded under the same id: nothing changed
+                return contract_id, None
+            
+            if text is not None:
+                # New contract, or a revised version of this one: analyse it
+                metadata['pages'] = pdf_stats.get('pages')
+                metadata['ocr_pages'] = pdf_stats.get('ocr_pages', [])
+                metadata['pages_without_text'] = pdf_stats.get('pages_without_text', [])
+                # Class probabilities from the last trained model, mapped rather than unpickled per worker
+                metadata['predicted_class'] = analyzer.classify_contract(text)
+                
+                terms = analyzer.extract_contract_terms(text)
+                metadata['extraction_degraded'] = analyzer.last_extraction_stats.get('degraded', False)
+                
+                # Store contract data
+                analyzer.add_contract(contract_id, text, terms, metadata)
+                return contract_id, None
+        
+        # Not an exact duplicate: extract outside the lock, then check again with the text
+        text, pdf_stats = analyzer.extract_document(filepath)
+
+def file_sha256(filepath):
+    with open(filepath, 'rb') as f:
+        hasher = hashlib.sha256()
+        for chunk in iter(lambda: f.read(app.config['UPLOAD_CHUNK_SIZE']), b''):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+def ingest_watched_files(paths, pool):
+    """Add, replace or remove contracts for PDFs changed in the watched upload folders"""
+    folder_types = {os.path.normpath(folder): contract_type for contract_type, folder in UPLOAD_FOLDER_MAP.items()}
+    result = {'ingested': [], 'removed': [], 'unchanged': [], 'duplicates': [], 'errors': []}
+    
+    to_extract = []
+    for path in paths:
+        contract_type = folder_types.get(os.path.normpath(os.path.dirname(path)))
+        if contract_type is None:
+            continue
+        filename = os.path.basename(path)
+        contract_id = f"{contract_type}_{filename}"
+        
+        if not os.path.exists(path):
+            with ingest_lock:
+                if analyzer.remove_contract(contract_id):
+                    result['removed'].append(contract_id)
+                released = analyzer.release_duplicates(contract_id)
+            # Copies that were linked to the removed contract are analysed in its place
+            for record in released.values():
+                metadata = record['metadata']
+                copy_path = os.path.join(UPLOAD_FOLDER_MAP[metadata['contract_type']], metadata['filename'])
+                if os.path.exists(copy_path):
+                    to_extract.append((copy_path, metadata['filename'], metadata['contract_type'],
+                                       metadata['sha256'], os.path.getsize(copy_path)))
+            continue
+        
+        # Files saved by /upload are already registered under the same hash
+        sha256 = file_sha256(path)
+        duplicate = analyzer.find_duplicate(sha256)
+        if duplicate and duplicate['duplicate_of'] == contract_id:
+            result['unchanged'].append(contract_id)
+            continue
+        to_extract.append((path, filename, contract_type, sha256, os.path.getsize(path)))
+    
+    # Text extraction runs in the watcher's worker pool; registration is serialised.
+    # The batch waits for a parse slot rather than being rejected like a request.
+    extractor = analyzer.pdf_extractor
+    new_contracts = []
+    with pdf_parse_slots.slot(blocking=True):
+        futures = [
+            (args, pool.submit(extract_document, args[0], extractor.backend.name, extractor.ocr))
+            for args in to_extract
+        ]
+        for args, future in futures:
+            try:
+                contract_id, duplicate = register_contract(*args, extracted=future.result())
+            except PDFExtractionError as e:
+                result['errors'].append(str(e))
+                continue
+            if duplicate:
+                result['duplicates'].append(contract_id)
+            else:
+                result['ingested'].append(contract_id)
+                new_contracts.append(contract_id)
+    
+    with ingest_lock:
+        analyzer.enrich_entities(new_contracts)
+    return result
+
+def start_upload_watcher():
+    """Start watching the upload folders; contracts found are marked for re-analysis on the next /analyze"""
+    global upload_watcher
+    if upload_watcher is None:
+        upload_watcher = UploadWatcher(
+            UPLOAD_FOLDER_MAP.values(), ingest_watched_files,
+            debounce_seconds=app.config['WATCH_DEBOUNCE_SECONDS'],
+            max_workers=app.config['WATCH_WORKERS'],
+            backend=app.config['WATCH_BACKEND']
+        )
+        upload_watcher.start()
+    return upload_watcher
+
+if app.config['WATCH_UPLOADS']:
+    start_upload_watcher()
+
 @app.route('/upload', methods=['POST'])
 def upload_file():
-    if 'file' not in request.files:
-        return jsonify({'error': 'No file selected'})
-    
-    file = request.files['file']
+    files = [f for f in request.files.getlist('file') if f.filename]
     contract_type = request.form.get('contract_type')
     
-    if file.filename == '':
+    if not files:
         return jsonify({'error': 'No file selected'})
+    # Contract ids are built from the type, so only the known counterparties are accepted
+    if contract_type not in UPLOAD_FOLDER_MAP:
+        return jsonify({'error': 'Invalid contract type'}), 400
     
-    if file and file.filename.lower().endswith('.pdf'):
-        filename = secure_filename(file.filename)
-        
-        # Determine upload folder based on contract type
-        folder_map = {
-            'azure-nadcomms': 'uploads/azure-nadcomms',
-            'nadcomms-customerA': 'uploads/nadcomms-customerA',
-            'nadcomms-customerB': 'uploads/nadcomms-customerB',
-            'nadcomms-customerC': 'uploads/nadcomms-customerC'
-        }
-        
-        upload_folder = folder_map.get(contract_type, 'uploads')
-        filepath = os.path.join(upload_folder, filename)
-        file.save(filepath)
-        
-        # Process the contract
-        text = analyzer.extract_text_from_pdf(filepath)
-        terms = analyzer.extract_contract_terms(text)
-        
-        # Store contract data
-        contract_id = f"{contract_type}_{filename}"
-        analyzer.contracts[contract_id] = {
-            'text': text,
-            'terms': terms,
-            'metadata': {
-                'filename': filename,
-                'contract_type': contract_type,
-                'upload_date': datetime.now().isoformat(),
-                'customer': contract_type.split('-')[-1] if 'customer' in contract_type else None
-            }
-        }
+    upload_folder = UPLOAD_FOLDER_MAP[contract_type]
+    uploaded = []
+    new_contracts = []
+    duplicates = {}
+    errors = []
+    
+    # One parse slot per request; its files are parsed one after another
+    with pdf_parse_slots.slot():
+        for file in files:
+            if not file.filename.lower().endswith('.pdf'):
+                errors.append(f'{file.filename}: Invalid file type. Please upload a PDF file.')
+                continue
+            
+            filename = secure_filename(file.filename)
+            filepath = os.path.join(upload_folder, filename)
+            hasher, size_bytes = stream_to_disk(file.stream, filepath)
+            try:
+                contract_id, duplicate = register_contract(filepath, filename, contract_type, hasher.hexdigest(), size_bytes)
+            except PDFExtractionError as e:
+                errors.append(str(e))
+                continue
+            uploaded.append(filename)
+            if duplicate:
+                duplicates[filename] = duplicate
+            else:
+                new_contracts.append(contract_id)
+                missing_pages = analyzer.contracts[contract_id]['metadata']['pages_without_text']
+                if missing_pages:
+                    errors.append(f'{filename}: {len(missing_pages)} page(s) have no extractable text')
+    
+    # Entity extraction runs once over the whole batch; it rewrites terms, so analysis must not be reading them
+    with ingest_lock:
+        analyzer.enrich_entities(new_contracts)
+    
+    if not uploaded:
+        return jsonify({'error': '; '.join(errors)})
+    
+    if len(uploaded) == 1:
+        message = f'Contract {uploaded[0]} uploaded successfully'
+    else:
+        message = f'{len(uploaded)} contracts uploaded successfully'
+    if duplicates:
+        message += f' ({len(duplicates)} linked as duplicates of existing contracts)'
+    return jsonify({'success': True, 'message': message, 'uploaded': uploaded,
+                    'duplicates': duplicates, 'errors': errors})
+
+def partial_upload_path(upload_id, suffix):
+    return os.path.join(app.config['PARTIAL_UPLOAD_FOLDER'], f'{upload_id}{suffix}')
+
+def get_chunked_upload(upload_id):
+    """State of an in-progress upload, restored from its partial file after a restart; None if unknown"""
+    if not re.fullmatch(r'[0-9a-f]{32}', upload_id):
+        return None
+    with chunked_uploads_lock:
+        state = chunked_uploads.get(upload_id)
+        if state is not None:
+            return state
+        try:
+            with open(partial_upload_path(upload_id, '.json'), 'r') as f:
+                meta = json.load(f)
+            # Bytes on disk are what was received; the hash is rebuilt from them
+            received = os.path.getsize(partial_upload_path(upload_id, '.part'))
+            hasher = hashlib.sha256()
+            with open(partial_upload_path(upload_id, '.part'), 'rb') as f:
+                for chunk in iter(lambda: f.read(app.config['UPLOAD_CHUNK_SIZE']), b''):
+                    hasher.update(chunk)
+        except (OSError, ValueError):
+            return None
+        state = chunked_uploads[upload_id] = dict(
+            meta, received=received, hasher=hasher, path=partial_upload_path(upload_id, '.part'),
+            lock=threading.Lock(), updated_at=time.time()
+        )
+        return state
+
+def discard_chunked_upload(upload_id):
+    """Forget an upload and delete its partial file and sidecar"""
+    with chunked_uploads_lock:
+        chunked_uploads.pop(upload_id, None)
+    for suffix in ('.part', '.json'):
+        if os.path.exists(partial_upload_path(upload_id, suffix)):
+            os.remove(partial_upload_path(upload_id, suffix))
+
+def expire_chunked_uploads():
+    """Discard uploads with no activity within CHUNKED_UPLOAD_TTL_SECONDS, including ones left by earlier runs"""
+    cutoff = time.time() - app.config['CHUNKED_UPLOAD_TTL_SECONDS']
+    with chunked_uploads_lock:
+        active = {upload_id for upload_id, state in chunked_uploads.items() if state['updated_at'] >= cutoff}
+    for entry in os.listdir(app.config['PARTIAL_UPLOAD_FOLDER']):
+        upload_id = entry.split('.')[0]
+        if upload_id in active:
+            continue
+        try:
+            stale = os.path.getmtime(os.path.join(app.config['PARTIAL_UPLOAD_FOLDER'], entry)) < cutoff
+        except FileNotFoundError:
+            continue
+        if stale:
+            discard_chunked_upload(upload_id)
+
+@app.route('/upload/chunked', methods=['POST'])
+def start_chunked_upload():
+    """Begin a resumable upload; returns an upload_id for subsequent chunks"""
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Expected a JSON object'}), 400
+    if not isinstance(data.get('filename', ''), str):
+        return jsonify({'error': 'filename must be a string'}), 400
+    filename = secure_filename(data.get('filename', ''))
+    try:
+        total_size = int(data.get('total_size', 0))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'total_size must be an integer'}), 400
+    
+    if not filename.lower().endswith('.pdf'):
+        return jsonify({'error': 'Invalid file type. Please upload a PDF file.'})
+    if not isinstance(data.get('contract_type'), str) or data['contract_type'] not in UPLOAD_FOLDER_MAP:
+        return jsonify({'error': 'Invalid contract type'}), 400
+    if total_size <= 0 or total_size > app.config['MAX_CONTENT_LENGTH']:
+        return jsonify({'error': f'File size must be between 1 and {app.config["MAX_CONTENT_LENGTH"]} bytes'}), 413
+    
+    expire_chunked_uploads()
+    upload_id = uuid.uuid4().hex
+    meta = {'filename': filename, 'contract_type': data.get('contract_type'), 'total_size': total_size}
+    open(partial_upload_path(upload_id, '.part'), 'wb').close()
+    with open(partial_upload_path(upload_id, '.json'), 'w') as f:
+        json.dump(meta, f)
+    with chunked_uploads_lock:
+        chunked_uploads[upload_id] = dict(
+            meta, received=0, hasher=hashlib.sha256(), path=partial_upload_path(upload_id, '.part'),
+            lock=threading.Lock(), updated_at=time.time()
+        )
+    return jsonify({'upload_id': upload_id, 'received': 0, 'chunk_size': app.config['UPLOAD_CHUNK_SIZE']})
+
+@app.route('/upload/chunked/<upload_id>', methods=['GET'])
+def chunked_upload_status(upload_id):
+    """Report how many bytes have been received so a client can resume"""
+    state = get_chunked_upload(upload_id)
+    if not state:
+        return jsonify({'error': 'Unknown upload id'}), 404
+    return jsonify({'upload_id': upload_id, 'received': state['received'], 'total_size': state['total_size']})
+
+@app.route('/upload/chunked/<upload_id>', methods=['PUT'])
+def upload_chunk(upload_id):
+    """Append the request body at the given offset; finalise once all bytes arrive"""
+    state = get_chunked_upload(upload_id)
+    if not state:
+        return jsonify({'error': 'Unknown upload id'}), 404
+    
+    # One request per upload at a time, so a retried chunk cannot be appended twice
+    with state['lock']:
+        if chunked_uploads.get(upload_id) is not state:
+            # Finished or discarded while this request waited
+            return jsonify({'error': 'Unknown upload id'}), 404
+        try:
+            offset = int(request.args.get('offset', state['received']))
+        except ValueError:
+            return jsonify({'error': 'offset must be an integer'}), 400
+        if offset != state['received']:
+            # Out-of-order or repeated chunk: tell the client where to resume from
+            return jsonify({'error': 'Unexpected offset', 'received': state['received']}), 409
         
-        return jsonify({'success': True, 'message': f'Contract {filename} uploaded successfully'})
+        if request.content_length is None or offset + request.content_length >= state['total_size']:
+            # Take the parse slot before consuming the last chunk, so a 429 can be retried at the same offset
+            with pdf_parse_slots.slot():
+                return append_chunk(upload_id, state)
+        return append_chunk(upload_id, state)
+
+def append_chunk(upload_id, state):
+    """Write the request body to the partial file and register the contract once it is complete"""
+    hasher_before = state['hasher'].copy()
+    try:
+        _, size = stream_to_disk(request.stream, state['path'], state['hasher'], mode='ab')
+    except Exception:
+        # A dropped connection leaves part of a chunk: roll the file and hash back to the last full chunk
+        with open(state['path'], 'r+b') as f:
+            f.truncate(state['received'])
+        state['hasher'] = hasher_before
+        raise
+    state['received'] += size
+    state['updated_at'] = time.time()
+    
+    if state['received'] > state['total_size']:
+        discard_chunked_upload(upload_id)
+        return jsonify({'error': 'Upload exceeded declared size'}), 413
+    
+    if state['received'] < state['total_size']:
+        return jsonify({'upload_id': upload_id, 'received': state['received']})
     
-    return jsonify({'error': 'Invalid file type. Please upload a PDF file.'})
+    # All bytes received: move into the contract folder and process
+    filename = state['filename']
+    filepath = os.path.join(UPLOAD_FOLDER_MAP[state['contract_type']], filename)
+    os.replace(state['path'], filepath)
+    discard_chunked_upload(upload_id)
+    try:
+        contract_id, duplicate = register_contract(filepath, filename, state['contract_type'],
+                                                   state['hasher'].hexdigest(), state['received'])
+    except PDFExtractionError as e:
+        return jsonify({'error': str(e)}), 422
+    if not duplicate:
+        with ingest_lock:
+            analyzer.enrich_entities([contract_id])
+    
+    message = f'Contract {filename} uploaded successfully'
+    if duplicate:
+        message += f' (linked as duplicate of {duplicate["duplicate_of"]})'
+    return jsonify({'success': True, 'message': message, 'duplicate': duplicate,
+                    'sha256': state['hasher'].hexdigest()})
 
 @app.route('/analyze', methods=['POST'])
 def analyze_contracts():
     if not analyzer.contracts:
         return jsonify({'error': 'No contracts uploaded yet'})
     
-    # Build enhanced knowledge graph
-    analyzer.build_enhanced_knowledge_graph()
+    # An unchanged corpus is answered from the cache; otherwise requests for the corpus
+    # a queued or running analysis already covers wait for its result
+    corpus_version = analyzer.corpus_version
+    body = response_cache.get(('analyze', corpus_version))
+    if body is None:
+        body = analysis_runs.run(corpus_version, run_analysis)
+    return app.response_class(body, mimetype='application/json')
+
+def run_analysis():
+    """Analyse the current corpus; uploads finish parsing meanwhile but register afterwards"""
+    with ingest_lock:
+        # Keyed on the version actually analysed, which may be newer than the one requested
+        corpus_version = analyzer.corpus_version
+        return response_cache.get_or_build(('analyze', corpus_version),
+                                           lambda: jsonify(analyze_corpus(corpus_version)).get_data())
+
+def analyze_corpus(corpus_version):
+    # Entities for any contracts not yet enriched at upload
+    analyzer.enrich_entities()
     
     # Train model
     training_success = analyzer.train_model()
     
-    # Detect advanced leakage for different contract types
-    azure_leakage = analyzer.detect_advanced_leakage('azure')
-    customer_leakage = analyzer.detect_advanced_leakage('customer')
+    # Segment the portfolio; later uploads are assigned to the nearest centroid
+    analyzer.fit_portfolio_clusters()
+    
+    if app.config['SHARDED_ANALYSIS'] != 'off':
+        # Per-counterparty shards build their own subgraph and findings; the coordinator merges them
+        compliance_report = ShardCoordinator(analyzer, mode=app.config['SHARDED_ANALYSIS']).run()
+    else:
+        # Build enhanced knowledge graph
+        analyzer.build_enhanced_knowledge_graph()
+        
+        # Generate comprehensive compliance report
+        compliance_report = analyzer.generate_compliance_report()
     
-    # Generate comprehensive compliance report
-    compliance_report = analyzer.generate_compliance_report()
+    # Leakage issues by contract type
+    azure_leakage = []
+    customer_leakage = []
+    for contract_id, analysis in compliance_report['contract_analysis'].items():
+        if 'azure' in contract_id:
+            azure_leakage.extend(analysis['leakage_issues'])
+        elif 'customer' in contract_id:
+            customer_leakage.extend(analysis['leakage_issues'])
     
     # Prepare analysis results
     results = {
@@ -244,6 +679,7 @@ def analyze_contracts():
         'azure_leakage_issues': azure_leakage,
         'customer_leakage_issues': customer_leakage,
         'compliance_report': compliance_report,
+        'corpus_version': corpus_version,
         'analysis_date': datetime.now().isoformat()
     }
     
@@ -251,16 +687,131 @@ def analyze_contracts():
     with open('analysis_results/latest_analysis.json', 'w') as f:
         json.dump(results, f, indent=2)
     
-    return jsonify(results)
+    if app.config['EXPORT_PRERENDER']:
+        for fmt in EXPORT_FORMATS:
+            report_exporter.request(fmt)
+    
+    return results
 
 @app.route('/results')
 def view_results():
+    # Only the summary is rendered; contract tables and findings are fetched on demand
+    results = results_view.load()
+    if results is None:
+        return render_template('results.html', results=None)
+    # The page depends only on the saved analysis, so it is keyed on the run that wrote it
+    key = ('results', results.get('corpus_version'), results['analysis_date'])
+    return response_cache.get_or_build(key, lambda: render_template('results.html', results=results_view.summary()))
+
+@app.route('/results/contracts')
+def results_contracts():
+    """Sorted page of analysed contracts, e.g. ?group=customer&sort=estimated_savings&order=desc&page=2"""
     try:
-        with open('analysis_results/latest_analysis.json', 'r') as f:
-            results = json.load(f)
-        return render_template('results.html', results=results)
+        page = results_view.contract_page(
+            group=request.args.get('group'),
+            sort=request.args.get('sort', 'risk_score'),
+            order=request.args.get('order', 'desc'),
+            page=request.args.get('page', 1, type=int),
+            per_page=request.args.get('per_page', 25, type=int)
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if page is None:
+        return jsonify({'error': 'No analysis results yet'}), 404
+    return jsonify(page)
+
+@app.route('/results/contracts/<path:contract_id>')
+def results_contract_detail(contract_id):
+    """Risk assessment and leakage issues for one contract"""
+    detail = results_view.contract_detail(contract_id)
+    if detail is None:
+        return jsonify({'error': f'No analysis for contract {contract_id}'}), 404
+    return jsonify(detail)
+
+@app.route('/reports/<fmt>')
+def export_report(fmt):
+    """Latest analysis as a PDF, XLSX or DOCX download; ?contract=<id> for one contract.
+    Returns 202 with Retry-After while the export renders in the background.
+    """
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'error': f'Unsupported format; use one of {", ".join(EXPORT_FORMATS)}'}), 404
+    contract_id = request.args.get('contract')
+    try:
+        status, detail = report_exporter.request(fmt, contract_id)
     except FileNotFoundError:
-        return render_template('results.html', results=None)
+        return jsonify({'error': 'No analysis results yet'}), 404
+    except KeyError:
+        return jsonify({'error': f'Unknown contract {contract_id}'}), 404
+    
+    if status == 'ready':
+        return send_file(detail, mimetype=EXPORT_FORMATS[fmt], as_attachment=True,
+                         download_name=os.path.basename(detail))
+    if status == 'failed':
+        return jsonify({'error': f'Export failed: {detail}'}), 500
+    response = jsonify({'status': 'rendering', 'format': fmt, 'contract': contract_id})
+    response.headers['Retry-After'] = '2'
+    return response, 202
+
+@app.route('/clusters')
+def portfolio_clusters():
+    """Portfolio segments with per-cluster leakage aggregates"""
+    return jsonify(analyzer.cluster_summary())
+
+@app.route('/margins')
+def margin_analysis():
+    """Azure cost vs customer revenue margins; recomputed only when contracts change"""
+    return jsonify(analyzer.margin_analysis())
+
+@app.route('/renewals')
+def renewal_calendar():
+    """Upcoming expiry, notice, review and escalation dates, e.g. /renewals?days=90"""
+    days = request.args.get('days', 180, type=int)
+    return jsonify(analyzer.renewal_calendar(days))
+
+@app.route('/renewals/alerts')
+def renewal_alerts():
+    """Alerts raised as contracts enter their alert window; ticks first so new uploads are included"""
+    analyzer.renewal_scheduler.tick()
+    return jsonify({
+        'last_tick': analyzer.renewal_scheduler.last_tick,
+        'alerts': list(analyzer.renewal_scheduler.alerts)
+    })
+
+@app.route('/watcher')
+def watcher_status():
+    """Upload folder watcher state and contracts awaiting re-analysis"""
+    return jsonify({
+        'watcher': upload_watcher.status() if upload_watcher else None,
+        'pending_analysis': sorted(analyzer.pending_analysis)
+    })
+
+@app.route('/simulate', methods=['POST'])
+def simulate_leakage():
+    """What-if re-scoring, e.g. {"thresholds": {"hardware_pricing_ratio": 1.2},
+    "rules": {"missing_renewal_penalties": {"impact": 80000}}, "include_contracts": true}"""
+    data = request.get_json(silent=True) or {}
+    overrides = {section: data[section] for section in ('thresholds', 'rules') if section in data}
+    try:
+        return jsonify(analyzer.simulate_leakage(overrides, bool(data.get('include_contracts'))))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+@app.route('/clauses')
+def search_clauses():
+    """Clause search, e.g. /clauses?category=penalties&q=late+payment&contract_type=nadcomms-customerB"""
+    clauses = analyzer.search_clauses(
+        category=request.args.get('category'),
+        keywords=request.args.get('q'),
+        contract_type=request.args.get('contract_type')
+    )
+    return jsonify({'count': len(clauses), 'clauses': clauses})
+
+@app.route('/contracts/metrics')
+def contract_metrics():
+    """Normalised numeric terms per contract for quantitative comparisons"""
+    metrics = analyzer.contract_metrics()
+    records = json.loads(metrics.reset_index().to_json(orient='records'))
+    return jsonify(records)
 
 @app.route('/contracts')
 def list_contracts():
@@ -270,9 +821,23 @@ def list_contracts():
             'id': contract_id,
             'filename': contract_data['metadata']['filename'],
             'type': contract_data['metadata']['contract_type'],
-            'upload_date': contract_data['metadata']['upload_date']
+            'upload_date': contract_data['metadata']['upload_date'],
+            'predicted_class': contract_data['metadata'].get('predicted_class')
+        })
+    for contract_id, duplicate in analyzer.duplicates.items():
+        contract_list.append({
+            'id': contract_id,
+            'filename': duplicate['metadata']['filename'],
+            'type': duplicate['metadata']['contract_type'],
+            'upload_date': duplicate['metadata']['upload_date'],
+            'duplicate_of': duplicate['duplicate_of']
         })
     return jsonify(contract_list)
 
+@app.route('/contracts/count')
+def count_contracts():
+    """Contract and duplicate counts for the sidebar, without listing the library"""
+    return jsonify({'contracts': len(analyzer.contracts), 'duplicates': len(analyzer.duplicates)})
+
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=5000)
@@ -0,0 +1,107 @@
+import os
+import sys
+import json
+import time
+import pickle
+from datetime import datetime
+from multiprocessing import get_context
+from model_store import MappedModel
+
+PICKLE_PATH = 'models/contract_model.pkl'
+MMAP_DIR = 'models/contract_model_mmap'
+
+
+def memory_usage_kb():
+    """RSS and PSS of the current process; PSS splits shared pages across the processes mapping them"""
+    usage = {}
+    try:
+        with open('/proc/self/smaps_rollup', 'r') as f:
+            for line in f:
+                key, value = line.split(':', 1)
+                if key in ('Rss', 'Pss'):
+                    usage[key.lower()] = int(value.split()[0])
+    except OSError:
+        # Not Linux: fall back to peak RSS
+        import resource
+        usage['rss'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return usage
+
+
+def _load_worker(fmt, sample_text, ready, release, results):
+    baseline = memory_usage_kb()
+    start = time.perf_counter()
+    if fmt == 'pickle':
+        with open(PICKLE_PATH, 'rb') as f:
+            model = pickle.load(f)
+        prediction = model['classifier'].predict(model['vectorizer'].transform([sample_text]))[0]
+    else:
+        model = MappedModel(MMAP_DIR)
+        prediction = model.predict(sample_text)
+    load_seconds = time.perf_counter() - start
+    loaded = memory_usage_kb()
+
+    # Hold the model until every worker has loaded, so shared pages are counted while shared
+    ready.wait()
+    final = memory_usage_kb()
+    results.put({
+        'format': fmt,
+        'pid': os.getpid(),
+        'load_and_predict_seconds': load_seconds,
+        'prediction': str(prediction),
+        'rss_delta_kb': loaded.get('rss', 0) - baseline.get('rss', 0),
+        'rss_kb': final.get('rss'),
+        'pss_kb': final.get('pss')
+    })
+    release.wait()
+
+
+def benchmark_model_loading(workers=4, sample_text='Monthly service fee of $45,000 for compute instances'):
+    """Load the model in N worker processes per format and record load time and memory per worker"""
+    context = get_context('spawn')
+    report = {}
+    for fmt, path in (('pickle', PICKLE_PATH), ('mmap', os.path.join(MMAP_DIR, 'CURRENT'))):
+        if not os.path.exists(path):
+            continue
+        ready = context.Barrier(workers + 1)
+        release = context.Barrier(workers + 1)
+        results = context.Queue()
+        processes = [
+            context.Process(target=_load_worker, args=(fmt, sample_text, ready, release, results))
+            for _ in range(workers)
+        ]
+        for process in processes:
+            process.start()
+        ready.wait()
+        rows = [results.get() for _ in processes]
+        release.wait()
+        for process in processes:
+            process.join()
+
+        report[fmt] = {
+            'workers': rows,
+            'mean_load_seconds': sum(r['load_and_predict_seconds'] for r in rows) / workers,
+            'total_rss_delta_kb': sum(r['rss_delta_kb'] for r in rows),
+            'total_pss_kb': sum(r['pss_kb'] or 0 for r in rows)
+        }
+    return report
+
+
+def main():
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    report = benchmark_model_loading(workers)
+    if not report:
+        print("No saved model found; run an analysis first")
+        return
+
+    for fmt, result in report.items():
+        print(f"{fmt:<7} workers={workers} mean load={result['mean_load_seconds'] * 1000:8.1f}ms "
+              f"rss delta total={result['total_rss_delta_kb'] / 1024:8.1f}MB "
+              f"pss total={result['total_pss_kb'] / 1024:8.1f}MB")
+
+    os.makedirs('analysis_results', exist_ok=True)
+    with open('analysis_results/model_loading_benchmark.json', 'w') as f:
+        json.dump({'benchmark_date': datetime.now().isoformat(), 'results': report}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+import re
+from collections import defaultdict
+
+# Numbered section headings as produced by PyPDF2, e.g. "1. SERVICE SPECIFICATIONS Azure shall ..."
+# The heading ends where the body starts: a Capitalised word, or an acronym followed by lower case
+HEADING_PATTERN = re.compile(
+    r'(?m)^[ \t]*(\d+(?:\.\d+)*)\.[ \t]+([A-Z][A-Z0-9&/,\-() ]*[A-Z)])(?=[ \t]+(?:[A-Z][a-z]|[A-Z]+[ \t]+[a-z])|[ \t]*$)'
+)
+TOKEN_PATTERN = re.compile(r'[a-z][a-z0-9\-]{2,}')
+STOP_WORDS = {'the', 'and', 'for', 'with', 'from', 'shall', 'are', 'per', 'all', 'any', 'this', 'that', 'each'}
+
+
+def segment_clauses(text):
+    """Split contract text into numbered clauses with character offsets into text"""
+    headings = list(HEADING_PATTERN.finditer(text))
+    clauses = []
+
+    preamble_end = headings[0].start() if headings else len(text)
+    if text[:preamble_end].strip():
+        clauses.append({'number': '0', 'heading': 'PREAMBLE', 'start': 0, 'end': preamble_end})
+
+    for i, heading in enumerate(headings):
+        end = headings[i + 1].start() if i + 1 < len(headings) else len(text)
+        clauses.append({
+            'number': heading.group(1),
+            'heading': heading.group(2).strip(),
+            'start': heading.start(),
+            'end': end
+        })
+
+    return clauses
+
+
+def tokenize(text):
+    return {token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOP_WORDS}
+
+
+class ClauseIndex:
+    """Inverted index from term category and keyword to clause ids"""
+
+    def __init__(self):
+        self.clauses = {}
+        self.contract_clauses = defaultdict(list)
+        self.by_category = defaultdict(set)
+        self.by_keyword = defaultdict(set)
+        self.clause_tokens = {}
+
+    def add(self, contract_id, text, term_patterns, metadata=None):
+        """Segment a contract and index each clause by category and keyword"""
+        self.insert(contract_id, self.parse(contract_id, text, term_patterns, metadata))
+
+    def parse(self, contract_id, text, term_patterns, metadata=None):
+        """(clause, tokens) entries for a contract, computed without touching the index"""
+        metadata = metadata or {}
+        entries = []
+        for clause in segment_clauses(text):
+            clause_id = f"{contract_id}#{clause['number']}"
+            clause_text = re.sub(r'\s+', ' ', text[clause['start']:clause['end']]).lower()
+
+            categories = [
+                category for category, config in term_patterns.items()
+                if any(re.search(pattern, clause_text) for pattern in config['patterns'])
+            ]
+
+            entries.append((
+                dict(clause, id=clause_id, contract=contract_id, contract_type=metadata.get('contract_type'),
+                     categories=categories),
+                tokenize(clause['heading'] + ' ' + clause_text)
+            ))
+        return entries
+
+    def insert(self, contract_id, entries):
+        """Index entries from parse(), replacing the contract's previous clauses"""
+        self.remove(contract_id)
+        for clause, tokens in entries:
+            clause_id = clause['id']
+            self.clauses[clause_id] = clause
+            self.contract_clauses[contract_id].append(clause_id)
+            for category in clause['categories']:
+                self.by_category[category].add(clause_id)
+            self.clause_tokens[clause_id] = tokens
+            for token in tokens:
+                self.by_keyword[token].add(clause_id)
+
+    def remove(self, contract_id):
+        for clause_id in self.contract_clauses.pop(contract_id, []):
+            clause = self.clauses.pop(clause_id)
+            for category in clause['categories']:
+                self.by_category[category].discard(clause_id)
+            for token in self.clause_tokens.pop(clause_id):
+                self.by_keyword[token].discard(clause_id)
+                if not self.by_keyword[token]:
+                    del self.by_keyword[token]
+
+    def search(self, category=None, keywords=None, contract_type=None):
+        """Return clause records matching every given filter"""
+        candidate_sets = []
+        if category:
+            candidate_sets.append(self.by_category.get(category, set()))
+        for token in tokenize(keywords or ''):
+            candidate_sets.append(self.by_keyword.get(token, set()))
+
+        if candidate_sets:
+            # Intersect smallest posting list first
+            candidate_sets.sort(key=len)
+            clause_ids = set(candidate_sets[0]).intersection(*candidate_sets[1:])
+        else:
+            clause_ids = set(self.clauses)
+
+        results = []
+        for clause_id in clause_ids:
+            clause = self.clauses[clause_id]
+            if contract_type and (clause['contract_type'] or '').lower() != contract_type.lower():
+                continue
+            results.append(clause)
+        return sorted(results, key=lambda c: (c['contract'], c['start']))
@@ -5,24 +5,106 @@ import numpy as np
 from datetime import datetime, timedelta
 from collections import defaultdict
 import networkx as nx
-from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.feature_extraction.text import TfidfVectorizer, HashingVectorizer
 from sklearn.ensemble import RandomForestClassifier
-from sklearn.cluster import KMeans
+from sklearn.linear_model import SGDClassifier
+from sklearn.feature_extraction.text import TfidfTransformer
+from sklearn.cluster import MiniBatchKMeans
+from scipy.sparse import hstack, csr_matrix
 from sklearn.metrics.pairwise import cosine_similarity
 import pickle
 import os
-import PyPDF2
+import time
+from dedup import MinHashLSH
+from clause_index import ClauseIndex
+from typed_terms import TypedTermTable, extract_typed_terms
+from margin_engine import MarginLeakageEngine, SUPPLIER_TYPES
+from nlp_extraction import NLPExtractor, SPACY_AVAILABLE
+from pdf_backends import PDFTextExtractor
+from ocr import PageOCR
+from model_store import save_mmap_model, current_model_version, MappedModel
+from leakage_simulation import LeakageSimulator, DEFAULT_LEAKAGE_CONFIG
+from renewal_timeline import RenewalTimeline, RenewalScheduler, extract_renewal_schedule
 
 class AdvancedContractAnalyzer:
     def __init__(self):
         self.contracts = {}
         self.knowledge_graph = nx.Graph()
         self.vectorizer = TfidfVectorizer(max_features=2000, stop_words='english', ngram_range=(1, 3))
-        self.classifier = RandomForestClassifier(n_estimators=200, random_state=42)
-        self.clustering_model = KMeans(n_clusters=5, random_state=42)
+        self.n_estimators = 200
+        self.classifier = RandomForestClassifier(n_estimators=self.n_estimators, random_state=42, n_jobs=-1)
+        self.n_clusters = 5
+        self.clustering_model = MiniBatchKMeans(n_clusters=self.n_clusters, random_state=42, batch_size=256, n_init=3)
+        # Fixed hashing space so new uploads can be placed without refitting a vocabulary
+        self.cluster_vectorizer = HashingVectorizer(n_features=2 ** 12, stop_words='english', alternate_sign=False, norm=None)
+        self.cluster_tfidf = TfidfTransformer()
+        self.clusters_fitted = False
+        self.cluster_assignments = {}
+        self.last_report = None
         self.trained = False
         self.contract_embeddings = {}
         
+        # 'batch' refits TF-IDF + RandomForest over the corpus; 'online' updates a
+        # stateless hashing model incrementally as each contract arrives
+        self.training_mode = os.environ.get('TRAINING_MODE', 'batch')
+        self.online_vectorizer = HashingVectorizer(n_features=2 ** 18, stop_words='english',
+                                                   ngram_range=(1, 3), alternate_sign=False, norm='l2')
+        self.online_classifier = SGDClassifier(loss='log_loss', random_state=42)
+        self.online_classes = ['infrastructure', 'service']
+        self.online_trained_ids = set()
+        self.online_labels_seen = set()
+        
+        # Wall-clock budget (seconds) for batch training; tree growth stops early when exceeded
+        self.training_time_budget = float(os.environ.get('TRAINING_TIME_BUDGET', 60))
+        self.training_metrics = {}
+        
+        # Memory-mapped copy of the batch model shared read-only by worker processes
+        self.shared_model_dir = 'models/contract_model_mmap'
+        self.shared_model = None
+        
+        # Optional spaCy entity stage (NLP_EXTRACTION=1); regex extraction is used on its own otherwise
+        self.nlp_extractor = None
+        if os.environ.get('NLP_EXTRACTION', '').lower() in ('1', 'true', 'yes') and SPACY_AVAILABLE:
+            self.nlp_extractor = NLPExtractor(
+                model=os.environ.get('SPACY_MODEL', 'en_core_web_sm'),
+                n_process=int(os.environ.get('NLP_PROCESSES', 1))
+            )
+        
+        # Created on first PDF so analysis-only processes (e.g. shard workers) skip the backend benchmark
+        self._pdf_extractor = None
+        
+        # Per-document regex budget (seconds). It is checked between categories, so remaining
+        # categories are skipped once exceeded but a single slow pattern can still overrun it
+        self.extraction_time_budget = float(os.environ.get('EXTRACTION_TIME_BUDGET', 5))
+        self.last_extraction_stats = {}
+        
+        # Ingest-time deduplication: exact content hashes and MinHash/LSH near-duplicates
+        self.content_hashes = {}
+        self.near_duplicate_index = MinHashLSH()
+        self.duplicates = {}
+        
+        # Clause-level inverted index for targeted queries across the corpus
+        self.clause_index = ClauseIndex()
+        
+        # Normalised numeric terms (amounts, capacities, durations) in a columnar table
+        self.typed_terms = TypedTermTable()
+        
+        # Supplier-cost to customer-revenue join; versions let it skip recomputation
+        self.margin_engine = MarginLeakageEngine()
+        self.side_versions = {'supplier': 0, 'customer': 0}
+        
+        # Per-contract findings reused across reports; contracts added or changed since are re-assessed
+        self.contract_assessments = {}
+        self.pending_analysis = set()
+        
+        # Rule thresholds, risk scores and impacts; the simulator re-scores the portfolio under alternatives
+        self.leakage_config = DEFAULT_LEAKAGE_CONFIG
+        self.leakage_simulator = LeakageSimulator()
+        
+        # Renewal, notice and escalation dates ordered by when their alert window opens
+        self.renewal_timeline = RenewalTimeline(alert_days=int(os.environ.get('RENEWAL_ALERT_DAYS', 30)))
+        self.renewal_scheduler = RenewalScheduler(self.renewal_timeline, self.evaluate_renewal_event)
+        
         # Enhanced patterns for contract term extraction
         self.term_patterns = {
             'pricing': {
@@ -93,35 +175,56 @@ class AdvancedContractAnalyzer:
             }
         }
     
+    @property
+    def pdf_extractor(self):
+        """PDF_BACKEND=auto benchmarks the installed backends and keeps the fastest.
+        Pages without a text layer are OCR'd with Tesseract unless OCR_FALLBACK=0.
+        """
+        if self._pdf_extractor is None:
+            ocr = PageOCR() if os.environ.get('OCR_FALLBACK', '1') != '0' else None
+            self._pdf_extractor = PDFTextExtractor(os.environ.get('PDF_BACKEND', 'auto'), ocr=ocr)
+        return self._pdf_extractor
+    
     def extract_text_from_pdf(self, pdf_path):
-        """Extract text from PDF file"""
-        try:
-            with open(pdf_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                text = ""
-                for page in pdf_reader.pages:
-                    text += page.extract_text()
-                return text
-        except Exception as e:
-            return f"Error extracting text: {str(e)}"
+        """Extract text from PDF file; raises PDFExtractionError on failure"""
+        return self.pdf_extractor.extract_text(pdf_path)
+    
+    def extract_document(self, pdf_path):
+        """(text, page stats) for a PDF; raises PDFExtractionError on failure"""
+        return self.pdf_extractor.extract_document(pdf_path)
+    
+    def normalize_text(self, text):
+        """Collapse whitespace runs so term patterns cannot backtrack over long gaps"""
+        return re.sub(r'\s+', ' ', text).lower()
     
-    def extract_contract_terms(self, text):
+    def extract_contract_terms(self, text, time_budget=None):
         """Enhanced contract term extraction with weighted scoring"""
         terms = {}
-        text_lower = text.lower()
+        text_lower = self.normalize_text(text)
+        
+        if time_budget is None:
+            time_budget = self.extraction_time_budget
+        start_time = time.perf_counter()
+        skipped_categories = []
         
         for category, config in self.term_patterns.items():
             matches = []
             scores = []
             
+            # Degrade gracefully: once the budget is spent, skip the remaining categories
+            if time_budget and time.perf_counter() - start_time > time_budget:
+                skipped_categories.append(category)
+                terms[category] = {'matches': [], 'scores': [], 'total_score': 0}
+                continue
+            
             for pattern in config['patterns']:
                 pattern_matches = re.finditer(pattern, text_lower, re.IGNORECASE)
                 for match in pattern_matches:
                     match_text = match.group()
                     # Calculate relevance score based on context
                     context_start = max(0, match.start() - 50)
-                    context_end = min(len(text), match.end() + 50)
-                    context = text[context_start:context_end].lower()
+                    context_end = min(len(text_lower), match.end() + 50)
+                    context = text_lower[context_start:context_end]
                     
                     # Score based on surrounding keywords
                     relevance_score = config['weight']
@@ -142,92 +245,308 @@ class AdvancedContractAnalyzer:
             else:
                 terms[category] = {'matches': [], 'scores': [], 'total_score': 0}
         
+        self.last_extraction_stats = {
+            'elapsed_seconds': time.perf_counter() - start_time,
+            'degraded': bool(skipped_categories),
+            'skipped_categories': skipped_categories
+        }
+        
         return terms
     
+    def add_contract(self, contract_id, text, terms, metadata):
+        """Store an analysed contract and update the ingest-time indexes.
+        
+        Everything derived from the text is computed first, so a parse error
+        leaves the analyzer exactly as it was.
+        """
+        clauses = self.clause_index.parse(contract_id, text, self.term_patterns, metadata)
+        normalized = self.normalize_text(text)
+        typed_terms = extract_typed_terms(normalized)
+        renewal_schedule = extract_renewal_schedule(normalized)
+        signature = self.near_duplicate_index.signature(text)
+        
+        self.contracts[contract_id] = {
+            'text': text,
+            'terms': terms,
+            'metadata': metadata
+        }
+        if metadata.get('sha256'):
+            self.register_fingerprint(contract_id, metadata['sha256'], text, metadata.get('contract_type'), signature)
+        self.clause_index.insert(contract_id, clauses)
+        self.typed_terms.add(contract_id, typed_terms)
+        self.renewal_timeline.add(contract_id, renewal_schedule)
+        side = 'supplier' if metadata.get('contract_type') in SUPPLIER_TYPES else 'customer'
+        self.side_versions[side] += 1
+        self.pending_analysis.add(contract_id)
+        
+        if self.training_mode == 'online':
+            self.partial_update(contract_id)
+        self.assign_cluster(contract_id)
+    
+    def remove_contract(self, contract_id):
+        """Drop a contract (or duplicate record) and its index entries, e.g. when its file is deleted"""
+        if self.duplicates.pop(contract_id, None) is not None:
+            return True
+        contract = self.contracts.pop(contract_id, None)
+        if contract is None:
+            return False
+        
+        self.remove_fingerprint(contract_id)
+        self.clause_index.remove(contract_id)
+        self.typed_terms.remove(contract_id)
+        self.renewal_timeline.remove(contract_id)
+        self.cluster_assignments.pop(contract_id, None)
+        self.contract_assessments.pop(contract_id, None)
+        self.pending_analysis.discard(contract_id)
+        side = 'supplier' if contract['metadata'].get('contract_type') in SUPPLIER_TYPES else 'customer'
+        self.side_versions[side] += 1
+        return True
+
+    @property
+    def corpus_version(self):
+        """Changes whenever a contract is added or removed; keys cached analysis responses"""
+        return sum(self.side_versions.values())
+
+    def enrich_entities(self, contract_ids=None):
+        """Merge spaCy entities (parties, dates, money...) into terms for contracts that lack them"""
+        if self.nlp_extractor is None:
+            return 0
+        
+        if contract_ids is None:
+            contract_ids = list(self.contracts)
+        pending = [cid for cid in contract_ids if cid in self.contracts and 'entities' not in self.contracts[cid]['terms']]
+        if not pending:
+            return 0
+        
+        try:
+            entities = self.nlp_extractor.extract_many([self.contracts[cid]['text'] for cid in pending])
+        except OSError as e:
+            # Model not installed: fall back to regex-only extraction
+            print(f"NLP extraction disabled: {str(e)}")
+            self.nlp_extractor = None
+            return 0
+        
+        for contract_id, contract_entities in zip(pending, entities):
+            self.contracts[contract_id]['terms']['entities'] = contract_entities
+        return len(pending)
+    
+    def contract_metrics(self):
+        """Per-contract numeric terms, e.g. monthly fee, total vCPU and cost per vCPU"""
+        return self.typed_terms.contract_metrics()
+    
+    def evaluate_renewal_event(self, contract_id, event, today):
+        """Alert for one contract whose renewal, notice or escalation window has opened"""
+        contract = self.contracts.get(contract_id)
+        schedule = self.renewal_timeline.schedules.get(contract_id)
+        if contract is None or schedule is None:
+            return None
+        
+        days_remaining = (event['date'] - today).days
+        due = event['date'].strftime('%B %d, %Y')
+        if event['type'] == 'notice_deadline':
+            if schedule['auto_renews']:
+                message = (f"Non-renewal notice due {due}; the contract otherwise renews "
+                           f"for {schedule['renewal_months']} months on current pricing")
+            else:
+                message = f"Termination notice due {due}"
+        elif event['type'] == 'renewal_review':
+            message = f"Renewal review due {due}; renegotiate pricing and volumes before renewal"
+        elif event['type'] == 'price_escalation':
+            message = f"{schedule['escalation_pct']}% price escalation takes effect {due}"
+        else:
+            message = f"Contract term ends {due}"
+        
+        if days_remaining < 0:
+            severity = 'Missed'
+        elif event['type'] == 'notice_deadline' and schedule['auto_renews'] or days_remaining <= 7:
+            severity = 'High'
+        else:
+            severity = 'Medium'
+        
+        return {
+            'contract': contract_id,
+            'contract_type': contract['metadata'].get('contract_type'),
+            'event': event['type'],
+            'date': event['date'].isoformat(),
+            'days_remaining': days_remaining,
+            'severity': severity,
+            'message': message,
+            # A missed notice on an auto-renewing contract without penalties locks in the current terms
+            'renewal_penalties': contract['terms'].get('penalties', {}).get('total_score', 0) > 0,
+            'raised_at': datetime.now().isoformat()
+        }
+    
+    def renewal_calendar(self, days=180):
+        """Dated renewal events in the next `days` days across the portfolio"""
+        events = self.renewal_timeline.upcoming(datetime.now().date(), days)
+        return [dict(event, date=event['date'].isoformat()) for event in events]
+    
+    def margin_analysis(self):
+        """Pass-through margin per customer against pooled supplier cost, cached per corpus version"""
+        versions = (self.side_versions['supplier'], self.side_versions['customer'])
+        cached = self.margin_engine.cached(versions)
+        if cached is not None:
+            return cached
+        
+        metrics = self.contract_metrics()
+        metrics['contract_type'] = [
+            self.contracts[contract_id]['metadata'].get('contract_type') if contract_id in self.contracts else None
+            for contract_id in metrics.index
+        ]
+        return self.margin_engine.compute(metrics, versions)
+    
+    def search_clauses(self, category=None, keywords=None, contract_type=None):
+        """Find clauses by term category, keywords and counterparty without rescanning full texts"""
+        results = []
+        for clause in self.clause_index.search(category, keywords, contract_type):
+            text = self.contracts[clause['contract']]['text']
+            results.append({
+                'id': clause['id'],
+                'contract': clause['contract'],
+                'number': clause['number'],
+                'heading': clause['heading'],
+                'start': clause['start'],
+                'end': clause['end'],
+                'categories': clause['categories'],
+                'text': text[clause['start']:clause['end']].strip()
+            })
+        return results
+    
+    def find_duplicate(self, sha256, text=None, contract_type=None):
+        """Return the existing contract this document duplicates, or None.
+        
+        An identical file matches regardless of counterparty; near-duplicates are only
+        matched within the same contract_type, since counterparties on one template
+        differ in exactly the terms (prices, volumes) the analysis is about.
+        """
+        if sha256 in self.content_hashes:
+            return {'duplicate_of': self.content_hashes[sha256], 'match': 'exact', 'similarity': 1.0}
+        
+        if text:
+            matches = self.near_duplicate_index.query(text, scope=contract_type)
+            if matches:
+                contract_id, similarity = matches[0]
+                return {'duplicate_of': contract_id, 'match': 'near', 'similarity': similarity}
+        
+        return None
+    
+    def register_fingerprint(self, contract_id, sha256, text, contract_type=None, signature=None):
+        """Record a newly analysed contract for future duplicate lookups"""
+        self.remove_fingerprint(contract_id)
+        self.content_hashes[sha256] = contract_id
+        if signature is None:
+            signature = self.near_duplicate_index.signature(text)
+        self.near_duplicate_index.add(contract_id, signature=signature, scope=contract_type)
+    
+    def remove_fingerprint(self, contract_id):
+        """Forget a contract's hashes, e.g. when it is replaced or deleted"""
+        for sha256 in [h for h, cid in self.content_hashes.items() if cid == contract_id]:
+            del self.content_hashes[sha256]
+        self.near_duplicate_index.remove(contract_id)
+    
+    def link_duplicate(self, contract_id, duplicate, metadata):
+        """Record a duplicate upload against the contract it copies instead of analysing it"""
+        self.duplicates[contract_id] = dict(duplicate, metadata=metadata)
+    
+    def release_duplicates(self, contract_id):
+        """Unlink and return the duplicate records of a removed contract, so their files can be ingested in its place"""
+        released = {dup_id: record for dup_id, record in self.duplicates.items() if record['duplicate_of'] == contract_id}
+        for dup_id in released:
+            del self.duplicates[dup_id]
+        return released
+    
     def detect_advanced_leakage(self, contract_type):
         """Advanced leakage detection with risk scoring"""
         leakage_issues = []
         
         for contract_id, contract_data in self.contracts.items():
             if contract_type in contract_id:
-                terms = contract_data['terms']
-                risk_score = 0
-                
-                # Hardware usage vs commitment analysis
-                hardware_score = terms.get('hardware_specs', {}).get('total_score', 0)
-                pricing_score = terms.get('pricing', {}).get('total_score', 0)
-                
-                if hardware_score > 0 and pricing_score > 0:
-                    # Check for potential over-provisioning
-                    if hardware_score > pricing_score * 1.5:
-                        risk_score += 30
-                        leakage_issues.append({
-                            'contract': contract_id,
-                            'type': 'Hardware Over-Provisioning',
-                            'description': 'High hardware specifications relative to pricing terms suggest potential over-provisioning',
-                            'severity': 'High',
-                            'risk_score': 30,
-                            'estimated_impact': '$75,000'
-                        })
-                
-                # Renewal penalty analysis
-                renewal_score = terms.get('renewals', {}).get('total_score', 0)
-                penalty_score = terms.get('penalties', {}).get('total_score', 0)
-                
-                if renewal_score > 0 and penalty_score == 0:
-                    risk_score += 25
-                    leakage_issues.append({
-                        'contract': contract_id,
-                        'type': 'Missing Renewal Penalties',
-                        'description': 'Renewal terms present but no penalty clauses for missed renewals',
-                        'severity': 'High',
-                        'risk_score': 25,
-                        'estimated_impact': '$50,000'
-                    })
-                
-                # Volume discount optimization
-                volume_score = terms.get('volume_discounts', {}).get('total_score', 0)
-                if volume_score > 0:
-                    # Check if volume discounts are being utilized
-                    if volume_score < 2.0:  # Low utilization indicator
-                        risk_score += 20
-                        leakage_issues.append({
-                            'contract': contract_id,
-                            'type': 'Underutilized Volume Discounts',
-                            'description': 'Volume discount opportunities may not be fully utilized',
-                            'severity': 'Medium',
-                            'risk_score': 20,
-                            'estimated_impact': '$35,000'
-                        })
-                
-                # SLA compliance monitoring
-                sla_score = terms.get('sla_terms', {}).get('total_score', 0)
-                if sla_score > 0 and penalty_score == 0:
-                    risk_score += 15
-                    leakage_issues.append({
-                        'contract': contract_id,
-                        'type': 'SLA Without Penalties',
-                        'description': 'SLA terms defined but no penalty structure for non-compliance',
-                        'severity': 'Medium',
-                        'risk_score': 15,
-                        'estimated_impact': '$25,000'
-                    })
-                
-                # License optimization
-                license_score = terms.get('license_terms', {}).get('total_score', 0)
-                if license_score > 0:
-                    # Check for potential license waste
-                    license_matches = terms.get('license_terms', {}).get('matches', [])
-                    if any('concurrent' in match for match in license_matches):
-                        risk_score += 10
-                        leakage_issues.append({
-                            'contract': contract_id,
-                            'type': 'License Optimization Opportunity',
-                            'description': 'Concurrent licensing model may offer cost savings',
-                            'severity': 'Low',
-                            'risk_score': 10,
-                            'estimated_impact': '$15,000'
-                        })
+                leakage_issues.extend(self.detect_contract_leakage(contract_id, contract_data['terms']))
+        
+        return leakage_issues
+    
+    def detect_contract_leakage(self, contract_id, terms):
+        """Leakage rules applied to a single contract's extracted terms"""
+        leakage_issues = []
+        risk_score = 0
+        thresholds = self.leakage_config['thresholds']
+        rules = self.leakage_config['rules']
+        
+        # Hardware usage vs commitment analysis
+        hardware_score = terms.get('hardware_specs', {}).get('total_score', 0)
+        pricing_score = terms.get('pricing', {}).get('total_score', 0)
+        
+        if hardware_score > 0 and pricing_score > 0:
+            # Check for potential over-provisioning
+            if hardware_score > pricing_score * thresholds['hardware_pricing_ratio']:
+                risk_score += rules['hardware_over_provisioning']['risk_score']
+                leakage_issues.append({
+                    'contract': contract_id,
+                    'type': 'Hardware Over-Provisioning',
+                    'description': 'High hardware specifications relative to pricing terms suggest potential over-provisioning',
+                    'severity': 'High',
+                    'risk_score': rules['hardware_over_provisioning']['risk_score'],
+                    'estimated_impact': f"${rules['hardware_over_provisioning']['impact']:,}"
+                })
+        
+        # Renewal penalty analysis
+        renewal_score = terms.get('renewals', {}).get('total_score', 0)
+        penalty_score = terms.get('penalties', {}).get('total_score', 0)
+        
+        if renewal_score > 0 and penalty_score == 0:
+            risk_score += rules['missing_renewal_penalties']['risk_score']
+            leakage_issues.append({
+                'contract': contract_id,
+                'type': 'Missing Renewal Penalties',
+                'description': 'Renewal terms present but no penalty clauses for missed renewals',
+                'severity': 'High',
+                'risk_score': rules['missing_renewal_penalties']['risk_score'],
+                'estimated_impact': f"${rules['missing_renewal_penalties']['impact']:,}"
+            })
+        
+        # Volume discount optimization
+        volume_score = terms.get('volume_discounts', {}).get('total_score', 0)
+        if volume_score > 0:
+            # Check if volume discounts are being utilized
+            if volume_score < thresholds['volume_utilization_cutoff']:  # Low utilization indicator
+                risk_score += rules['underutilized_volume_discounts']['risk_score']
+                leakage_issues.append({
+                    'contract': contract_id,
+                    'type': 'Underutilized Volume Discounts',
+                    'description': 'Volume discount opportunities may not be fully utilized',
+                    'severity': 'Medium',
+                    'risk_score': rules['underutilized_volume_discounts']['risk_score'],
+                    'estimated_impact': f"${rules['underutilized_volume_discounts']['impact']:,}"
+                })
+        
+        # SLA compliance monitoring
+        sla_score = terms.get('sla_terms', {}).get('total_score', 0)
+        if sla_score > 0 and penalty_score == 0:
+            risk_score += rules['sla_without_penalties']['risk_score']
+            leakage_issues.append({
+                'contract': contract_id,
+                'type': 'SLA Without Penalties',
+                'description': 'SLA terms defined but no penalty structure for non-compliance',
+                'severity': 'Medium',
+                'risk_score': rules['sla_without_penalties']['risk_score'],
+                'estimated_impact': f"${rules['sla_without_penalties']['impact']:,}"
+            })
+        
+        # License optimization
+        license_score = terms.get('license_terms', {}).get('total_score', 0)
+        if license_score > 0:
+            # Check for potential license waste
+            license_matches = terms.get('license_terms', {}).get('matches', [])
+            if any('concurrent' in match for match in license_matches):
+                risk_score += rules['license_optimization']['risk_score']
+                leakage_issues.append({
+                    'contract': contract_id,
+                    'type': 'License Optimization Opportunity',
+                    'description': 'Concurrent licensing model may offer cost savings',
+                    'severity': 'Low',
+                    'risk_score': rules['license_optimization']['risk_score'],
+                    'estimated_impact': f"${rules['license_optimization']['impact']:,}"
+                })
         
         return leakage_issues
     
@@ -329,55 +648,77 @@ class AdvancedContractAnalyzer:
         else:
             return 'Low Risk'
     
+    def assess_contract(self, contract_id, terms):
+        """Risk level, score, issues and estimated savings for one contract"""
+        leakage_issues = self.detect_contract_leakage(contract_id, terms)
+        
+        # Calculate risk level
+        total_risk_score = sum(issue['risk_score'] for issue in leakage_issues)
+        thresholds = self.leakage_config['thresholds']
+        if total_risk_score > thresholds['high_risk_score']:
+            risk_level = 'High'
+        elif total_risk_score > thresholds['medium_risk_score']:
+            risk_level = 'Medium'
+        else:
+            risk_level = 'Low'
+        
+        # Calculate estimated savings
+        estimated_savings = sum(
+            int(issue['estimated_impact'].replace('$', '').replace(',', ''))
+            for issue in leakage_issues
+        )
+        
+        return {
+            'risk_level': risk_level,
+            'risk_score': total_risk_score,
+            'leakage_issues': leakage_issues,
+            'estimated_savings': estimated_savings
+        }
+    
+    def simulate_leakage(self, overrides, include_contracts=False):
+        """Compare portfolio risk and savings under alternative thresholds/impacts without re-analysing"""
+        self.leakage_simulator.load(self.contracts, tuple(self.side_versions.values()))
+        return self.leakage_simulator.compare(self.leakage_config, overrides, include_contracts)
+    
     def generate_compliance_report(self):
         """Generate comprehensive compliance and leakage report"""
+        # Only contracts added or changed since the last report are re-assessed
+        for contract_id, contract_data in self.contracts.items():
+            if contract_id in self.pending_analysis or contract_id not in self.contract_assessments:
+                self.contract_assessments[contract_id] = self.assess_contract(contract_id, contract_data['terms'])
+        self.pending_analysis.clear()
+        
+        contract_analysis = {contract_id: self.contract_assessments[contract_id] for contract_id in self.contracts}
+        return self.build_compliance_report(contract_analysis)
+    
+    def build_compliance_report(self, contract_analysis, knowledge_graph=None):
+        """Assemble summary, portfolio sections and recommendations from per-contract analyses"""
+        knowledge_graph = self.knowledge_graph if knowledge_graph is None else knowledge_graph
         report = {
             'summary': {
-                'total_contracts': len(self.contracts),
+                'total_contracts': len(contract_analysis),
                 'high_risk_contracts': 0,
                 'medium_risk_contracts': 0,
                 'low_risk_contracts': 0,
                 'total_estimated_savings': 0
             },
-            'contract_analysis': {},
+            'contract_analysis': contract_analysis,
             'recommendations': [],
             'knowledge_graph_metrics': {
-                'nodes': self.knowledge_graph.number_of_nodes(),
-                'edges': self.knowledge_graph.number_of_edges(),
-                'density': nx.density(self.knowledge_graph) if self.knowledge_graph.number_of_nodes() > 0 else 0
+                'nodes': knowledge_graph.number_of_nodes(),
+                'edges': knowledge_graph.number_of_edges(),
+                'density': nx.density(knowledge_graph) if knowledge_graph.number_of_nodes() > 0 else 0
             }
         }
         
-        # Analyze each contract
-        for contract_id, contract_data in self.contracts.items():
-            contract_type = 'azure' if 'azure' in contract_id.lower() else 'customer'
-            leakage_issues = self.detect_advanced_leakage(contract_type)
-            
-            # Calculate risk level
-            total_risk_score = sum(issue['risk_score'] for issue in leakage_issues)
-            if total_risk_score > 50:
-                risk_level = 'High'
-                report['summary']['high_risk_contracts'] += 1
-            elif total_risk_score > 20:
-                risk_level = 'Medium'
-                report['summary']['medium_risk_contracts'] += 1
-            else:
-                risk_level = 'Low'
-                report['summary']['low_risk_contracts'] += 1
-            
-            # Calculate estimated savings
-            estimated_savings = sum(
-                int(issue['estimated_impact'].replace('$', '').replace(',', ''))
-                for issue in leakage_issues
-            )
-            report['summary']['total_estimated_savings'] += estimated_savings
-            
-            report['contract_analysis'][contract_id] = {
-                'risk_level': risk_level,
-                'risk_score': total_risk_score,
-                'leakage_issues': leakage_issues,
-                'estimated_savings': estimated_savings
-            }
+        for analysis in contract_analysis.values():
+            report['summary'][f"{analysis['risk_level'].lower()}_risk_contracts"] += 1
+            report['summary']['total_estimated_savings'] += analysis['estimated_savings']
+        
+        # Cross-contract margin leakage (supplier cost vs customer revenue)
+        margin_analysis = self.margin_analysis()
+        report['margin_analysis'] = margin_analysis
+        report['summary']['annual_margin_gap'] = margin_analysis['total_annual_margin_gap']
         
         # Generate recommendations
         if report['summary']['high_risk_contracts'] > 0:
@@ -394,31 +735,169 @@ class AdvancedContractAnalyzer:
                 'description': f"Potential savings of ${report['summary']['total_estimated_savings']:,} identified"
             })
         
+        below_target = [row['contract'] for row in margin_analysis['customers'] if row['below_target']]
+        if below_target:
+            report['recommendations'].append({
+                'priority': 'High',
+                'action': 'Reprice customer contracts below target pass-through margin',
+                'description': f"{len(below_target)} customer contracts are below the "
+                               f"{margin_analysis['target_margin']:.0%} target margin on Azure costs "
+                               f"(${margin_analysis['total_annual_margin_gap']:,.0f} per year)"
+            })
+        
+        self.last_report = report
         return report
     
+    def term_score_vector(self, terms):
+        """Category total scores in term_patterns order"""
+        return [terms.get(category, {}).get('total_score', 0) for category in self.term_patterns]
+    
+    def cluster_features(self, contract_ids, fit=False):
+        """TF-IDF text features joined with L2-normalised term-score vectors"""
+        counts = self.cluster_vectorizer.transform([self.contracts[cid]['text'] for cid in contract_ids])
+        tfidf = self.cluster_tfidf.fit_transform(counts) if fit else self.cluster_tfidf.transform(counts)
+        
+        scores = np.array([self.term_score_vector(self.contracts[cid]['terms']) for cid in contract_ids], dtype=float)
+        norms = np.linalg.norm(scores, axis=1, keepdims=True)
+        scores = np.divide(scores, norms, out=np.zeros_like(scores), where=norms > 0)
+        return hstack([tfidf, csr_matrix(scores)]).tocsr()
+    
+    def fit_portfolio_clusters(self):
+        """Segment the portfolio with mini-batch k-means and cache every contract's cluster"""
+        contract_ids = list(self.contracts)
+        if len(contract_ids) < 2:
+            return False
+        
+        self.clustering_model.set_params(n_clusters=min(self.n_clusters, len(contract_ids)))
+        labels = self.clustering_model.fit_predict(self.cluster_features(contract_ids, fit=True))
+        self.cluster_assignments = dict(zip(contract_ids, (int(label) for label in labels)))
+        self.clusters_fitted = True
+        return True
+    
+    def assign_cluster(self, contract_id):
+        """Place a new contract at its nearest existing centroid without refitting"""
+        if not self.clusters_fitted:
+            return None
+        label = int(self.clustering_model.predict(self.cluster_features([contract_id]))[0])
+        self.cluster_assignments[contract_id] = label
+        return label
+    
+    def cluster_summary(self):
+        """Per-cluster size, risk mix, savings and mean term scores from the latest report"""
+        contract_analysis = (self.last_report or {}).get('contract_analysis', {})
+        clusters = {}
+        
+        for contract_id, label in self.cluster_assignments.items():
+            if contract_id not in self.contracts:
+                continue
+            cluster = clusters.setdefault(label, {
+                'cluster': label,
+                'contracts': [],
+                'risk_levels': {'High': 0, 'Medium': 0, 'Low': 0},
+                'total_risk_score': 0,
+                'total_estimated_savings': 0,
+                'term_scores': []
+            })
+            cluster['contracts'].append(contract_id)
+            cluster['term_scores'].append(self.term_score_vector(self.contracts[contract_id]['terms']))
+            analysis = contract_analysis.get(contract_id)
+            if analysis:
+                cluster['risk_levels'][analysis['risk_level']] += 1
+                cluster['total_risk_score'] += analysis['risk_score']
+                cluster['total_estimated_savings'] += analysis['estimated_savings']
+        
+        for cluster in clusters.values():
+            size = len(cluster['contracts'])
+            cluster['size'] = size
+            cluster['average_risk_score'] = cluster['total_risk_score'] / size
+            cluster['mean_term_scores'] = dict(zip(self.term_patterns, np.mean(cluster.pop('term_scores'), axis=0).tolist()))
+        
+        return sorted(clusters.values(), key=lambda c: c['total_estimated_savings'], reverse=True)
+    
+    def load_shared_model(self):
+        """Map the published model version read-only, re-opening it when a newer one has been
+        published (possibly by another process); returns False if none has been saved"""
+        for _ in range(2):
+            version = current_model_version(self.shared_model_dir)
+            if version is None:
+                return False
+            if self.shared_model is not None and self.shared_model.version == version:
+                return True
+            try:
+                self.shared_model = MappedModel(self.shared_model_dir, version)
+                return True
+            except FileNotFoundError:
+                # Pruned between reading CURRENT and opening it; resolve again
+                continue
+        return self.shared_model is not None
+    
+    def classify_contract(self, contract_text):
+        """Contract class probabilities from the shared memory-mapped model, or None before training"""
+        if not self.load_shared_model():
+            return None
+        return self.shared_model.predict_proba(contract_text)
+    
+    def contract_label(self, contract_id):
+        """Simple labeling based on contract type"""
+        return 'infrastructure' if 'azure' in contract_id.lower() else 'service'
+    
+    def partial_update(self, contract_id):
+        """Incrementally fit the online model on one contract without revisiting the corpus"""
+        label = self.contract_label(contract_id)
+        X = self.online_vectorizer.transform([self.contracts[contract_id]['text']])
+        self.online_classifier.partial_fit(X, [label], classes=self.online_classes)
+        self.online_trained_ids.add(contract_id)
+        self.online_labels_seen.add(label)
+        
+        # Predictions are only meaningful once both classes have been seen
+        if self.training_mode == 'online' and len(self.online_labels_seen) == len(self.online_classes):
+            self.trained = True
+    
+    def train_online_model(self):
+        """Catch the online model up on any contracts it has not seen, then persist it"""
+        for contract_id in self.contracts:
+            if contract_id not in self.online_trained_ids:
+                self.partial_update(contract_id)
+        
+        if len(self.online_labels_seen) < len(self.online_classes):
+            return False
+        
+        # The hashing vectorizer is stateless, so only its parameters need saving
+        os.makedirs('models', exist_ok=True)
+        with open('models/contract_model_online.pkl', 'wb') as f:
+            pickle.dump({
+                'vectorizer': self.online_vectorizer,
+                'classifier': self.online_classifier,
+                'trained_ids': sorted(self.online_trained_ids)
+            }, f)
+        return True
+    
     def train_model(self):
         """Train ML model on contract data"""
         if not self.contracts:
             return False
         
+        if self.training_mode == 'online':
+            return self.train_online_model()
+        
         # Prepare training data
         texts = []
         labels = []
         
         for contract_id, contract_data in self.contracts.items():
             texts.append(contract_data['text'])
-            # Simple labeling based on contract type
-            if 'azure' in contract_id.lower():
-                labels.append('infrastructure')
-            else:
-                labels.append('service')
+            labels.append(self.contract_label(contract_id))
         
         if len(set(labels)) < 2:
             return False
         
         try:
+            timings = {}
+            start_time = time.perf_counter()
+            
             # Vectorize text
             X = self.vectorizer.fit_transform(texts)
+            timings['vectorize_seconds'] = time.perf_counter() - start_time
             
             # Train classifier if we have enough data
             if len(texts) >= 2:
@@ -427,17 +906,45 @@ class AdvancedContractAnalyzer:
                     X_train, X_test, y_train, y_test = train_test_split(X, labels, test_size=0.2, random_state=42)
                 else:
                     X_train, y_train = X, labels
+                    X_test, y_test = None, None
                 
-                self.classifier.fit(X_train, y_train)
+                fit_start = time.perf_counter()
+                trees_grown = self.fit_forest_with_budget(X_train, y_train, self.training_time_budget)
+                timings['fit_seconds'] = time.perf_counter() - fit_start
                 self.trained = True
                 
+                metrics = {
+                    'n_contracts': len(texts),
+                    'n_estimators_requested': self.n_estimators,
+                    'n_estimators_grown': trees_grown,
+                    'stopped_early': trees_grown < self.n_estimators,
+                    'holdout_accuracy': float(self.classifier.score(X_test, y_test)) if X_test is not None else None
+                }
+                
+                # k-fold evaluation sized to whatever budget remains
+                remaining = self.training_time_budget - (time.perf_counter() - start_time)
+                cv_start = time.perf_counter()
+                metrics['cross_validation'] = self.cross_validate_model(
+                    texts, labels, trees_grown, time_budget=remaining,
+                    vectorize_seconds=timings['vectorize_seconds'], fit_seconds=timings['fit_seconds']
+                ) if remaining > 0 else None
+                timings['cross_validation_seconds'] = time.perf_counter() - cv_start
+                timings['total_seconds'] = time.perf_counter() - start_time
+                
+                self.training_metrics = dict(metrics, timings=timings, trained_at=datetime.now().isoformat())
+                
                 # Save model
                 os.makedirs('models', exist_ok=True)
                 with open('models/contract_model.pkl', 'wb') as f:
                     pickle.dump({
                         'vectorizer': self.vectorizer,
-                        'classifier': self.classifier
+                        'classifier': self.classifier,
+                        'metrics': self.training_metrics
                     }, f)
+                with open('models/contract_model_metrics.json', 'w') as f:
+                    json.dump(self.training_metrics, f, indent=2)
+                save_mmap_model(self.vectorizer, self.classifier, self.shared_model_dir)
+                self.load_shared_model()
                 
                 return True
         except Exception as e:
@@ -445,3 +952,68 @@ class AdvancedContractAnalyzer:
             return False
         
         return False
+    
+    def fit_forest_with_budget(self, X, y, time_budget, batch_size=25):
+        """Grow the forest in batches of trees across all cores, stopping when the budget runs out"""
+        self.classifier.set_params(n_estimators=0, warm_start=True, n_jobs=-1)
+        # Drop trees from a previous training run
+        if hasattr(self.classifier, 'estimators_'):
+            del self.classifier.estimators_
+        
+        start_time = time.perf_counter()
+        while self.classifier.n_estimators < self.n_estimators:
+            self.classifier.set_params(n_estimators=min(self.classifier.n_estimators + batch_size, self.n_estimators))
+            self.classifier.fit(X, y)
+            if time_budget and time.perf_counter() - start_time > time_budget:
+                break
+        
+        return self.classifier.n_estimators
+    
+    def cross_validate_model(self, texts, labels, n_estimators, time_budget=None, vectorize_seconds=0.0,
+                             fit_seconds=0.0, min_estimators=10):
+        """Stratified k-fold accuracy with folds evaluated in parallel worker processes.
+        
+        Folds cannot be interrupted once started, so their cost is estimated from the
+        main training run (vectorize_seconds, fit_seconds) and folds, then trees, are
+        cut until the estimate fits time_budget; if even the smallest run does not fit,
+        cross-validation is skipped.
+        """
+        from sklearn.model_selection import StratifiedKFold, cross_validate
+        from sklearn.pipeline import make_pipeline
+        
+        n_splits = min(5, min(labels.count(label) for label in set(labels)))
+        if n_splits < 2:
+            return None
+        
+        if time_budget is not None and n_estimators > 0:
+            # The main fit ran its trees across all cores; each fold fits on a single core
+            cores = os.cpu_count() or 1
+            seconds_per_tree = fit_seconds * min(cores, n_estimators) / n_estimators
+            
+            def estimate(splits, trees):
+                return -(-splits // cores) * (vectorize_seconds + seconds_per_tree * trees)
+            
+            while n_splits > 2 and estimate(n_splits, n_estimators) > time_budget:
+                n_splits -= 1
+            if estimate(n_splits, n_estimators) > time_budget and seconds_per_tree > 0:
+                affordable = int((time_budget / -(-n_splits // cores) - vectorize_seconds) / seconds_per_tree)
+                n_estimators = max(min_estimators, min(n_estimators, affordable))
+            if estimate(n_splits, n_estimators) > time_budget:
+                return {'skipped': True, 'estimated_seconds': estimate(n_splits, n_estimators),
+                        'budget_seconds': time_budget}
+        
+        # Refit the vectorizer inside each fold so held-out vocabulary does not leak
+        pipeline = make_pipeline(
+            TfidfVectorizer(max_features=2000, stop_words='english', ngram_range=(1, 3)),
+            RandomForestClassifier(n_estimators=n_estimators, random_state=42, n_jobs=1)
+        )
+        scores = cross_validate(pipeline, texts, labels,
+                                cv=StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=42),
+                                scoring='accuracy', n_jobs=-1)
+        return {
+            'folds': n_splits,
+            'n_estimators': n_estimators,
+            'accuracy_mean': float(np.mean(scores['test_score'])),
+            'accuracy_std': float(np.std(scores['test_score'])),
+            'fit_seconds_per_fold': [float(t) for t in scores['fit_time']]
+        }
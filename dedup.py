@@ -0,0 +1,96 @@
+import re
+import hashlib
+import numpy as np
+from collections import defaultdict
+
+# Mersenne prime used for the universal hash family h(x) = (a * x + b) mod p
+MERSENNE_PRIME = (1 << 61) - 1
+MAX_HASH = (1 << 32) - 1
+
+
+class MinHashLSH:
+    """MinHash signatures over word shingles with banded LSH for sub-linear near-duplicate lookup.
+
+    Documents are indexed under a scope (e.g. counterparty) and only match
+    documents in the same scope. Documents with fewer than min_shingles
+    shingles, such as scans without a text layer, are neither indexed nor
+    matched: their signatures say nothing about their content.
+    """
+
+    def __init__(self, num_perm=128, bands=32, shingle_size=5, threshold=0.9, seed=42, min_shingles=20):
+        if num_perm % bands != 0:
+            raise ValueError("num_perm must be divisible by bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.threshold = threshold
+        self.min_shingles = min_shingles
+
+        rng = np.random.RandomState(seed)
+        self.a = rng.randint(1, MAX_HASH, size=num_perm, dtype=np.uint64)
+        self.b = rng.randint(0, MAX_HASH, size=num_perm, dtype=np.uint64)
+
+        self.signatures = {}
+        self.scopes = {}
+        self.buckets = defaultdict(set)
+
+    def shingles(self, text):
+        """Hashed word n-grams of the normalised text"""
+        words = re.findall(r'\w+', text.lower())
+        return {
+            int.from_bytes(hashlib.blake2b(' '.join(words[i:i + self.shingle_size]).encode(),
+                                           digest_size=4).digest(), 'little')
+            for i in range(len(words) - self.shingle_size + 1)
+        }
+
+    def signature(self, text):
+        """MinHash signature: the minimum permuted hash per permutation, or None for too little text"""
+        shingles = np.fromiter(self.shingles(text), dtype=np.uint64)
+        if len(shingles) < max(self.min_shingles, 1):
+            return None
+        # Products stay below 2**64 because both operands are 32-bit
+        hashes = (np.outer(shingles, self.a) + self.b) % np.uint64(MERSENNE_PRIME)
+        return (hashes & np.uint64(MAX_HASH)).min(axis=0)
+
+    def _band_keys(self, signature, scope):
+        for band in range(self.bands):
+            yield scope, band, signature[band * self.rows:(band + 1) * self.rows].tobytes()
+
+    def add(self, key, text=None, signature=None, scope=None):
+        """Index a document under key; returns None (not indexed) when it has too little text"""
+        if signature is None:
+            signature = self.signature(text)
+        if signature is None:
+            return None
+        self.signatures[key] = signature
+        self.scopes[key] = scope
+        for band_key in self._band_keys(signature, scope):
+            self.buckets[band_key].add(key)
+        return signature
+
+    def remove(self, key):
+        signature = self.signatures.pop(key, None)
+        if signature is None:
+            return
+        for band_key in self._band_keys(signature, self.scopes.pop(key)):
+            self.buckets[band_key].discard(key)
+            if not self.buckets[band_key]:
+                del self.buckets[band_key]
+
+    def query(self, text=None, signature=None, scope=None):
+        """Return (key, estimated_jaccard) pairs in scope at or above the threshold, best first"""
+        if signature is None:
+            signature = self.signature(text)
+        if signature is None:
+            return []
+        candidates = set()
+        for band_key in self._band_keys(signature, scope):
+            candidates.update(self.buckets.get(band_key, ()))
+
+        results = []
+        for key in candidates:
+            similarity = float(np.mean(self.signatures[key] == signature))
+            if similarity >= self.threshold:
+                results.append((key, similarity))
+        return sorted(results, key=lambda x: x[1], reverse=True)
@@ -0,0 +1,142 @@
+import copy
+import time
+import numpy as np
+
+# Thresholds, risk scores and impact amounts used by the per-contract leakage rules
+DEFAULT_LEAKAGE_CONFIG = {
+    'thresholds': {
+        'hardware_pricing_ratio': 1.5,      # hardware score above pricing score x ratio -> over-provisioning
+        'volume_utilization_cutoff': 2.0,   # volume discount score below this -> under-utilised
+        'high_risk_score': 50,              # contract risk score above this -> High
+        'medium_risk_score': 20             # contract risk score above this -> Medium
+    },
+    'rules': {
+        'hardware_over_provisioning': {'risk_score': 30, 'impact': 75000},
+        'missing_renewal_penalties': {'risk_score': 25, 'impact': 50000},
+        'underutilized_volume_discounts': {'risk_score': 20, 'impact': 35000},
+        'sla_without_penalties': {'risk_score': 15, 'impact': 25000},
+        'license_optimization': {'risk_score': 10, 'impact': 15000}
+    }
+}
+
+RULES = list(DEFAULT_LEAKAGE_CONFIG['rules'])
+FEATURES = ['hardware_specs', 'pricing', 'renewals', 'penalties', 'volume_discounts', 'sla_terms',
+            'license_terms', 'concurrent_licensing']
+
+
+def merge_config(base, overrides):
+    """Copy of base with overrides applied; unknown sections, keys or non-numeric values raise ValueError"""
+    config = copy.deepcopy(base)
+    for section, values in (overrides or {}).items():
+        if section not in config or not isinstance(values, dict):
+            raise ValueError(f"Unknown section '{section}'")
+        for key, value in values.items():
+            if key not in config[section]:
+                raise ValueError(f"Unknown {section[:-1]} '{key}'")
+            if section == 'rules':
+                if not isinstance(value, dict):
+                    raise ValueError(f"Invalid value for {key}")
+                for field, amount in value.items():
+                    if field not in config[section][key] or not isinstance(amount, (int, float)):
+                        raise ValueError(f"Invalid value for {key}.{field}")
+                    config[section][key][field] = amount
+            elif isinstance(value, (int, float)):
+                config[section][key] = value
+            else:
+                raise ValueError(f"Invalid value for {key}")
+    return config
+
+
+def term_features(terms):
+    """Category scores the leakage rules read, in FEATURES order"""
+    license_matches = terms.get('license_terms', {}).get('matches', [])
+    return [terms.get(category, {}).get('total_score', 0) for category in FEATURES[:-1]] + \
+        [float(any('concurrent' in match for match in license_matches))]
+
+
+class LeakageSimulator:
+    """Re-scores the whole portfolio under alternative thresholds from a cached term-score matrix"""
+
+    def __init__(self):
+        self.version = None
+        self.contract_ids = []
+        self.features = np.zeros((0, len(FEATURES)))
+
+    def load(self, contracts, version):
+        """Rebuild the score matrix only when the corpus has changed"""
+        if version == self.version:
+            return False
+        self.contract_ids = list(contracts)
+        self.features = np.array([term_features(contracts[cid]['terms']) for cid in self.contract_ids],
+                                 dtype=float).reshape(-1, len(FEATURES))
+        self.version = version
+        return True
+
+    def fired_rules(self, config):
+        """Boolean matrix (contracts x RULES) mirroring AdvancedContractAnalyzer.detect_contract_leakage"""
+        f = dict(zip(FEATURES, self.features.T))
+        thresholds = config['thresholds']
+        no_penalties = f['penalties'] == 0
+        return np.column_stack([
+            (f['hardware_specs'] > 0) & (f['pricing'] > 0) &
+            (f['hardware_specs'] > f['pricing'] * thresholds['hardware_pricing_ratio']),
+            (f['renewals'] > 0) & no_penalties,
+            (f['volume_discounts'] > 0) & (f['volume_discounts'] < thresholds['volume_utilization_cutoff']),
+            (f['sla_terms'] > 0) & no_penalties,
+            (f['license_terms'] > 0) & (f['concurrent_licensing'] > 0)
+        ]).reshape(-1, len(RULES))
+
+    def evaluate(self, config):
+        fired = self.fired_rules(config)
+        risk_scores = fired @ np.array([config['rules'][rule]['risk_score'] for rule in RULES], dtype=float)
+        savings = fired @ np.array([config['rules'][rule]['impact'] for rule in RULES], dtype=float)
+        levels = np.where(risk_scores > config['thresholds']['high_risk_score'], 'High',
+                          np.where(risk_scores > config['thresholds']['medium_risk_score'], 'Medium', 'Low'))
+        return {
+            'fired': fired,
+            'risk_scores': risk_scores,
+            'savings': savings,
+            'levels': levels,
+            'summary': {
+                'total_contracts': len(self.contract_ids),
+                'high_risk_contracts': int((levels == 'High').sum()),
+                'medium_risk_contracts': int((levels == 'Medium').sum()),
+                'low_risk_contracts': int((levels == 'Low').sum()),
+                'total_estimated_savings': float(savings.sum()),
+                'issues_by_rule': dict(zip(RULES, fired.sum(axis=0).astype(int).tolist()))
+            }
+        }
+
+    def compare(self, current_config, overrides, include_contracts=False):
+        """Side-by-side portfolio summary for the current configuration and a what-if scenario"""
+        start_time = time.perf_counter()
+        scenario_config = merge_config(current_config, overrides)
+        current = self.evaluate(current_config)
+        scenario = self.evaluate(scenario_config)
+
+        delta = {
+            key: scenario['summary'][key] - current['summary'][key]
+            for key in ('high_risk_contracts', 'medium_risk_contracts', 'low_risk_contracts',
+                        'total_estimated_savings')
+        }
+        changed = np.flatnonzero((current['levels'] != scenario['levels']) |
+                                 (current['savings'] != scenario['savings']))
+        result = {
+            'current': dict(current['summary'], config=current_config),
+            'scenario': dict(scenario['summary'], config=scenario_config),
+            'delta': delta,
+            'changed_contracts': len(changed)
+        }
+        if include_contracts:
+            result['contracts'] = [
+                {
+                    'contract': self.contract_ids[i],
+                    'current': {'risk_level': str(current['levels'][i]), 'risk_score': float(current['risk_scores'][i]),
+                                'estimated_savings': float(current['savings'][i])},
+                    'scenario': {'risk_level': str(scenario['levels'][i]), 'risk_score': float(scenario['risk_scores'][i]),
+                                 'estimated_savings': float(scenario['savings'][i])}
+                }
+                for i in changed
+            ]
+        result['elapsed_ms'] = (time.perf_counter() - start_time) * 1000
+        return result
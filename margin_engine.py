@@ -0,0 +1,95 @@
+import numpy as np
+
+SUPPLIER_TYPES = ('azure-nadcomms',)
+
+
+class MarginLeakageEngine:
+    """Join supplier-side resource costs to customer-side revenue and find pass-through margin gaps.
+
+    Supplier capacity (vCPU, RAM, storage) and cost are pooled across all
+    supplier contracts and allocated to customers in proportion to their
+    licensed users. Results are cached until either side of the join changes.
+    """
+
+    def __init__(self, target_margin=0.2):
+        self.target_margin = target_margin
+        self._cache_key = None
+        self._cache = None
+
+    def supplier_index(self, metrics):
+        """Pooled monthly cost and capacity per resource across supplier contracts"""
+        supplier = metrics[metrics['contract_type'].isin(SUPPLIER_TYPES)]
+        monthly_cost = float(supplier['monthly_fee'].fillna(0).sum())
+        capacity = {
+            'vcpu': float(supplier['total_vcpu'].fillna(0).sum()),
+            'ram_gb': float(supplier['total_ram_gb'].fillna(0).sum()),
+            'storage_gb': float(supplier['storage_gb'].fillna(0).sum())
+        }
+        unit_costs = {
+            resource: (monthly_cost / quantity if quantity else None)
+            for resource, quantity in capacity.items()
+        }
+        return {
+            'contracts': list(supplier.index),
+            'monthly_cost': monthly_cost,
+            'capacity': capacity,
+            'unit_costs': unit_costs
+        }
+
+    def cached(self, versions):
+        """Previous result if neither side has changed since it was computed"""
+        if self._cache_key == (versions, self.target_margin):
+            return self._cache
+        return None
+
+    def compute(self, metrics, versions):
+        """Margin per customer contract; metrics is AdvancedContractAnalyzer.contract_metrics() plus contract_type"""
+        cached = self.cached(versions)
+        if cached is not None:
+            return cached
+        cache_key = (versions, self.target_margin)
+
+        supplier = self.supplier_index(metrics)
+        customers = metrics[~metrics['contract_type'].isin(SUPPLIER_TYPES)]
+
+        # One vectorised pass over every customer contract
+        revenue = customers['monthly_fee'].fillna(0).to_numpy(dtype=float)
+        users = customers['licensed_users'].fillna(0).to_numpy(dtype=float)
+        total_users = users.sum()
+        share = users / total_users if total_users else np.zeros_like(users)
+
+        allocated_cost = share * supplier['monthly_cost']
+        allocated_vcpu = share * supplier['capacity']['vcpu']
+        margin = revenue - allocated_cost
+        with np.errstate(divide='ignore', invalid='ignore'):
+            margin_pct = np.where(revenue > 0, margin / revenue, np.nan)
+            revenue_per_vcpu = np.where(allocated_vcpu > 0, revenue / allocated_vcpu, np.nan)
+        # Monthly shortfall against the target margin, annualised
+        annual_gap = np.maximum(self.target_margin * revenue - margin, 0) * 12
+
+        rows = []
+        for i, contract_id in enumerate(customers.index):
+            rows.append({
+                'contract': contract_id,
+                'monthly_revenue': float(revenue[i]),
+                'licensed_users': float(users[i]),
+                'allocation_share': float(share[i]),
+                'allocated_monthly_cost': float(allocated_cost[i]),
+                'allocated_vcpu': float(allocated_vcpu[i]),
+                'revenue_per_vcpu': None if np.isnan(revenue_per_vcpu[i]) else float(revenue_per_vcpu[i]),
+                'monthly_margin': float(margin[i]),
+                'margin_pct': None if np.isnan(margin_pct[i]) else float(margin_pct[i]),
+                'annual_margin_gap': float(annual_gap[i]),
+                'below_target': bool(annual_gap[i] > 0)
+            })
+
+        self._cache = {
+            'target_margin': self.target_margin,
+            'supplier': supplier,
+            'customers': rows,
+            'total_monthly_revenue': float(revenue.sum()),
+            'total_monthly_margin': float(margin.sum()),
+            'total_annual_margin_gap': float(annual_gap.sum())
+        }
+        self._cache_key = cache_key
+        return self._cache
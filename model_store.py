@@ -0,0 +1,152 @@
+import os
+import json
+import time
+import shutil
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+# Vectorizer parameters needed to rebuild its (stateless) analyzer in another process
+ANALYZER_PARAMS = ('lowercase', 'stop_words', 'ngram_range', 'token_pattern', 'analyzer', 'strip_accents')
+
+
+def current_model_version(root):
+    """Name of the published model version under root, or None before the first save"""
+    try:
+        with open(os.path.join(root, 'CURRENT'), 'r') as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def save_mmap_model(vectorizer, classifier, root, keep_versions=2):
+    """Write a fitted TF-IDF vectorizer and random forest as flat .npy arrays plus a JSON manifest.
+
+    Each call writes a new version directory under root and then atomically
+    repoints root/CURRENT at it. Files of a published version are never
+    rewritten, since truncating a file another process has mapped kills
+    that process with SIGBUS; older versions are unlinked, which leaves
+    existing mappings intact. Returns the new version name.
+    """
+    version = f'v{time.time_ns()}-{os.getpid()}'
+    directory = os.path.join(root, version)
+    os.makedirs(directory)
+
+    # Vocabulary as a sorted fixed-width byte array searched with np.searchsorted
+    terms = sorted(vectorizer.vocabulary_)
+    np.save(os.path.join(directory, 'vocab_terms.npy'), np.array([t.encode('utf-8') for t in terms]))
+    np.save(os.path.join(directory, 'vocab_index.npy'),
+            np.array([vectorizer.vocabulary_[t] for t in terms], dtype=np.int32))
+    np.save(os.path.join(directory, 'idf.npy'), vectorizer.idf_.astype(np.float64))
+
+    # All trees concatenated; child indices are rebased to global node ids
+    lefts, rights, features, thresholds, values, roots = [], [], [], [], [], []
+    offset = 0
+    for estimator in classifier.estimators_:
+        tree = estimator.tree_
+        is_leaf = tree.children_left == -1
+        lefts.append(np.where(is_leaf, -1, tree.children_left + offset))
+        rights.append(np.where(is_leaf, -1, tree.children_right + offset))
+        features.append(tree.feature)
+        thresholds.append(tree.threshold)
+        value = tree.value[:, 0, :]
+        values.append(value / value.sum(axis=1, keepdims=True))
+        roots.append(offset)
+        offset += tree.node_count
+
+    arrays = {
+        'children_left': np.concatenate(lefts).astype(np.int32),
+        'children_right': np.concatenate(rights).astype(np.int32),
+        'feature': np.concatenate(features).astype(np.int32),
+        'threshold': np.concatenate(thresholds).astype(np.float64),
+        'value': np.concatenate(values).astype(np.float64),
+        'roots': np.array(roots, dtype=np.int32)
+    }
+    for name, array in arrays.items():
+        np.save(os.path.join(directory, f'{name}.npy'), array)
+
+    params = vectorizer.get_params()
+    manifest = {
+        'version': version,
+        'classes': [str(c) for c in classifier.classes_],
+        'n_features': len(vectorizer.idf_),
+        'n_trees': len(classifier.estimators_),
+        'norm': params['norm'],
+        'sublinear_tf': params['sublinear_tf'],
+        'analyzer_params': {
+            key: (list(params[key]) if isinstance(params[key], tuple) else params[key])
+            for key in ANALYZER_PARAMS
+        }
+    }
+    with open(os.path.join(directory, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    pointer_tmp = os.path.join(root, f'CURRENT.{os.getpid()}.tmp')
+    with open(pointer_tmp, 'w') as f:
+        f.write(version)
+    os.replace(pointer_tmp, os.path.join(root, 'CURRENT'))
+
+    # The previous version is kept for readers that resolved CURRENT just before the swap
+    versions = sorted(entry for entry in os.listdir(root) if entry.startswith('v'))
+    for old in versions[:-keep_versions]:
+        shutil.rmtree(os.path.join(root, old), ignore_errors=True)
+    return version
+
+
+class MappedModel:
+    """Read-only model whose arrays are memory-mapped, so worker processes share one copy in the page cache"""
+
+    ARRAYS = ('vocab_terms', 'vocab_index', 'idf', 'children_left', 'children_right',
+              'feature', 'threshold', 'value', 'roots')
+
+    def __init__(self, root, version=None):
+        self.version = version or current_model_version(root)
+        if self.version is None:
+            raise FileNotFoundError(f'No model version published in {root}')
+        directory = os.path.join(root, self.version)
+        with open(os.path.join(directory, 'manifest.json'), 'r') as f:
+            self.manifest = json.load(f)
+        for name in self.ARRAYS:
+            setattr(self, name, np.load(os.path.join(directory, f'{name}.npy'), mmap_mode='r'))
+
+        analyzer_params = dict(self.manifest['analyzer_params'])
+        analyzer_params['ngram_range'] = tuple(analyzer_params['ngram_range'])
+        self.analyze = TfidfVectorizer(**analyzer_params).build_analyzer()
+        self.classes = self.manifest['classes']
+
+    def transform(self, text):
+        """Dense TF-IDF vector for one document, matching the original vectorizer"""
+        x = np.zeros(self.manifest['n_features'])
+        tokens = [token.encode('utf-8') for token in self.analyze(text)]
+        if not tokens:
+            return x
+
+        tokens = np.array(tokens)
+        positions = np.searchsorted(self.vocab_terms, tokens)
+        positions = np.minimum(positions, len(self.vocab_terms) - 1)
+        known = self.vocab_terms[positions] == tokens
+        np.add.at(x, self.vocab_index[positions[known]], 1.0)
+
+        if self.manifest['sublinear_tf']:
+            x[x > 0] = np.log(x[x > 0]) + 1
+        x *= self.idf
+        if self.manifest['norm'] == 'l2':
+            norm = np.linalg.norm(x)
+            if norm > 0:
+                x /= norm
+        return x
+
+    def predict_proba(self, text):
+        """Mean leaf class distribution over all trees, descending every tree in lock-step"""
+        x = self.transform(text)
+        nodes = np.array(self.roots)
+        active = self.children_left[nodes] != -1
+        while active.any():
+            current = nodes[active]
+            go_left = x[self.feature[current]] <= self.threshold[current]
+            nodes[active] = np.where(go_left, self.children_left[current], self.children_right[current])
+            active = self.children_left[nodes] != -1
+        return dict(zip(self.classes, np.asarray(self.value[nodes]).mean(axis=0).tolist()))
+
+    def predict(self, text):
+        probabilities = self.predict_proba(text)
+        return max(probabilities, key=probabilities.get)
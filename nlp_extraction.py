@@ -0,0 +1,72 @@
+import hashlib
+
+try:
+    import spacy
+    SPACY_AVAILABLE = True
+except ImportError:
+    SPACY_AVAILABLE = False
+
+# Entity labels merged into the terms dict
+ENTITY_LABELS = {
+    'ORG': 'parties',
+    'PERSON': 'people',
+    'DATE': 'dates',
+    'MONEY': 'money',
+    'PERCENT': 'percentages',
+    'CARDINAL': 'quantities'
+}
+# Only the NER component (and the tok2vec it listens to) is needed
+DISABLED_COMPONENTS = ['parser', 'tagger', 'attribute_ruler', 'lemmatizer', 'senter']
+
+
+class NLPExtractor:
+    """Batched spaCy entity extraction with a per-document cache keyed by content hash"""
+
+    def __init__(self, model='en_core_web_sm', batch_size=16, n_process=1, max_entities=25):
+        self.model = model
+        self.batch_size = batch_size
+        self.n_process = n_process
+        self.max_entities = max_entities
+        self.cache = {}
+        self._nlp = None
+
+    @property
+    def available(self):
+        return SPACY_AVAILABLE
+
+    @property
+    def nlp(self):
+        if self._nlp is None:
+            self._nlp = spacy.load(self.model, disable=DISABLED_COMPONENTS)
+            # Contracts can exceed spaCy's 1M character default; NER alone does not need the parser's memory
+            self._nlp.max_length = 5_000_000
+        return self._nlp
+
+    @staticmethod
+    def content_hash(text):
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+    def _entities(self, doc):
+        entities = {name: [] for name in ENTITY_LABELS.values()}
+        for ent in doc.ents:
+            name = ENTITY_LABELS.get(ent.label_)
+            if name and len(entities[name]) < self.max_entities:
+                value = ent.text.strip()
+                if value and value not in entities[name]:
+                    entities[name].append(value)
+        return entities
+
+    def extract_many(self, texts):
+        """Entities for each text; uncached texts are processed together through nlp.pipe"""
+        keys = [self.content_hash(text) for text in texts]
+        pending = {key: text for key, text in zip(keys, texts) if key not in self.cache}
+
+        if pending:
+            docs = self.nlp.pipe(pending.values(), batch_size=self.batch_size, n_process=self.n_process)
+            for key, doc in zip(pending.keys(), docs):
+                self.cache[key] = self._entities(doc)
+
+        return [self.cache[key] for key in keys]
+
+    def extract(self, text):
+        return self.extract_many([text])[0]
@@ -0,0 +1,103 @@
+import os
+import hashlib
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import pytesseract
+except ImportError:
+    pytesseract = None
+
+try:
+    import pypdfium2
+except ImportError:
+    pypdfium2 = None
+
+# The Python packages only; tesseract_available() also checks for the tesseract binary
+OCR_AVAILABLE = pytesseract is not None and pypdfium2 is not None
+
+
+@lru_cache(maxsize=None)
+def tesseract_available():
+    """Whether OCR can actually run: the packages import and the tesseract binary is on PATH (checked once)"""
+    if not OCR_AVAILABLE:
+        return False
+    try:
+        pytesseract.get_tesseract_version()
+    except Exception as e:
+        print(f"OCR fallback disabled: {str(e)}")
+        return False
+    return True
+
+
+def has_text_layer(page_text, min_chars=20):
+    """A page with fewer than min_chars non-whitespace characters is treated as scanned"""
+    return len(''.join(page_text.split())) >= min_chars
+
+
+def _ocr_page(path, index, dpi, lang, cache_dir):
+    """Render one page, look it up in the page cache by image hash, and OCR it on a miss"""
+    pdf = pypdfium2.PdfDocument(path)
+    try:
+        image = pdf[index].render(scale=dpi / 72).to_pil()
+    finally:
+        pdf.close()
+
+    page_hash = hashlib.sha256(image.tobytes()).hexdigest()
+    cache_path = os.path.join(cache_dir, f'{page_hash}.txt')
+    if os.path.exists(cache_path):
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            return f.read(), True
+
+    try:
+        text = pytesseract.image_to_string(image, lang=lang)
+    except Exception as e:
+        # pytesseract's exceptions do not survive unpickling in the parent, which would break the pool
+        raise RuntimeError(f'Tesseract failed on page {index + 1}: {str(e)}') from None
+    # Write then rename so concurrent workers never read a partial entry
+    tmp_path = f'{cache_path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp_path, cache_path)
+    return text, False
+
+
+class PageOCR:
+    """Tesseract OCR applied only to pages without a text layer, in a process pool"""
+
+    def __init__(self, cache_dir='ocr_cache', dpi=300, lang='eng', max_workers=None):
+        self.cache_dir = cache_dir
+        self.dpi = dpi
+        self.lang = lang
+        self.max_workers = max_workers
+
+    @property
+    def available(self):
+        return tesseract_available()
+
+    def fill_missing_pages(self, path, pages):
+        """Replace text-less pages with OCR output; returns (pages, ocr_page_numbers, cache_hits)"""
+        missing = [i for i, text in enumerate(pages) if not has_text_layer(text)]
+        if not missing or not self.available:
+            return pages, [], 0
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        pages = list(pages)
+        cache_hits = 0
+        with ProcessPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = {
+                i: pool.submit(_ocr_page, path, i, self.dpi, self.lang, self.cache_dir)
+                for i in missing
+            }
+            ocr_pages = []
+            for i, future in futures.items():
+                try:
+                    pages[i], cached = future.result()
+                except RuntimeError as e:
+                    # The page stays empty and is reported as having no text
+                    print(f"OCR failed for {os.path.basename(path)}: {str(e)}")
+                    continue
+                ocr_pages.append(i)
+                cache_hits += cached
+
+        return pages, ocr_pages, cache_hits
@@ -0,0 +1,143 @@
+import os
+import re
+import sys
+import json
+import time
+from datetime import datetime
+from contract_analyzer import AdvancedContractAnalyzer
+from pdf_backends import PDFExtractionError
+
+# Adjacent whitespace quantifiers separated only by optional tokens, e.g. \s*(?:of)?\s*
+ADJACENT_QUANTIFIER = re.compile(r'\\s\*(?:\(\?:[^()]*\)\?|\\?.\?)*\\s\*')
+# A quantified group that itself contains a quantifier, e.g. (a+)+ or (?:\s*x)*
+NESTED_QUANTIFIER = re.compile(r'\((?:\?:)?[^()]*[*+][^()]*\)[*+]')
+
+ADVERSARIAL_LENGTHS = (500, 1000, 2000)
+SUPERLINEAR_RATIO = 3.0
+
+
+def find_backtracking_risks(pattern):
+    """Statically flag pattern constructs prone to catastrophic backtracking"""
+    risks = []
+    if ADJACENT_QUANTIFIER.search(pattern):
+        risks.append('adjacent \\s* quantifiers around optional tokens')
+    if NESTED_QUANTIFIER.search(pattern):
+        risks.append('nested quantifier')
+    return risks
+
+
+def build_adversarial_text(pattern, length):
+    """Build a near-miss input: pattern keywords separated by long whitespace runs"""
+    keywords = [word for word in re.findall(r'[a-z]{3,}', pattern) if word not in ('per',)]
+    gap = ' ' * length
+    return gap.join(keywords[:4] or ['x']) + gap + '#'
+
+
+def time_pattern(pattern, text, repeat=3):
+    """Best-of-N wall time to scan text with pattern"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        sum(1 for _ in re.finditer(pattern, text, re.IGNORECASE))
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def load_synthetic_corpus():
+    """Contract texts from the sample contract generator"""
+    try:
+        from sample_contracts import create_azure_nadcomms_contract, create_customer_contract
+    except ImportError:
+        return {}
+
+    return {
+        'synthetic_azure_nadcomms': create_azure_nadcomms_contract(),
+        'synthetic_customerA': create_customer_contract('CustomerA', 'Enterprise ERP Solution'),
+        'synthetic_customerB': create_customer_contract('CustomerB', 'Advanced Analytics Platform'),
+        'synthetic_customerC': create_customer_contract('CustomerC', 'Cloud Integration Suite')
+    }
+
+
+def load_uploaded_corpus(analyzer, upload_root='uploads'):
+    """Extract text from every PDF under the uploads tree"""
+    corpus = {}
+    for root, _, files in os.walk(upload_root):
+        for filename in files:
+            if filename.lower().endswith('.pdf'):
+                path = os.path.join(root, filename)
+                try:
+                    corpus[path] = analyzer.extract_text_from_pdf(path)
+                except PDFExtractionError as e:
+                    print(f"Skipping {path}: {str(e)}")
+    return corpus
+
+
+def audit_term_patterns(analyzer, corpus):
+    """Benchmark each term pattern on the corpus and on adversarial near-miss inputs"""
+    normalized_corpus = {doc_id: analyzer.normalize_text(text) for doc_id, text in corpus.items()}
+    results = []
+
+    for category, config in analyzer.term_patterns.items():
+        for pattern in config['patterns']:
+            raw_time = sum(time_pattern(pattern, text.lower()) for text in corpus.values())
+            normalized_time = sum(time_pattern(pattern, text) for text in normalized_corpus.values())
+            match_count = sum(
+                len(re.findall(pattern, text, re.IGNORECASE)) for text in normalized_corpus.values()
+            )
+
+            # Empirical growth: doubling the input should roughly double the time
+            adversarial_times = [
+                time_pattern(pattern, build_adversarial_text(pattern, length), repeat=1)
+                for length in ADVERSARIAL_LENGTHS
+            ]
+            growth = adversarial_times[-1] / max(adversarial_times[-2], 1e-9)
+
+            static_risks = find_backtracking_risks(pattern)
+            results.append({
+                'category': category,
+                'pattern': pattern,
+                'matches': match_count,
+                'corpus_seconds_raw': raw_time,
+                'corpus_seconds_normalized': normalized_time,
+                'adversarial_seconds': dict(zip(ADVERSARIAL_LENGTHS, adversarial_times)),
+                'adversarial_growth': growth,
+                'static_risks': static_risks,
+                'flagged': bool(static_risks) or growth > SUPERLINEAR_RATIO
+            })
+
+    return sorted(results, key=lambda r: r['corpus_seconds_raw'], reverse=True)
+
+
+def main():
+    analyzer = AdvancedContractAnalyzer()
+    corpus = load_synthetic_corpus()
+    corpus.update(load_uploaded_corpus(analyzer, sys.argv[1] if len(sys.argv) > 1 else 'uploads'))
+
+    if not corpus:
+        print("No contracts found to audit")
+        return
+
+    results = audit_term_patterns(analyzer, corpus)
+
+    print(f"Audited {len(results)} patterns over {len(corpus)} documents\n")
+    for result in results:
+        flag = 'RISK' if result['flagged'] else 'ok  '
+        print(f"[{flag}] {result['category']:<18} raw={result['corpus_seconds_raw'] * 1000:8.2f}ms "
+              f"normalized={result['corpus_seconds_normalized'] * 1000:8.2f}ms "
+              f"growth={result['adversarial_growth']:5.1f}x  {result['pattern']}")
+        for risk in result['static_risks']:
+            print(f"         - {risk}")
+
+    os.makedirs('analysis_results', exist_ok=True)
+    with open('analysis_results/pattern_audit.json', 'w') as f:
+        json.dump({
+            'audit_date': datetime.now().isoformat(),
+            'documents': len(corpus),
+            'extraction_time_budget': analyzer.extraction_time_budget,
+            'patterns': results
+        }, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
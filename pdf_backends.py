@@ -0,0 +1,207 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import PyPDF2
+
+try:
+    import pypdfium2
+except ImportError:
+    pypdfium2 = None
+
+try:
+    import pymupdf
+except ImportError:
+    pymupdf = None
+
+
+class PDFExtractionError(Exception):
+    """Raised when a PDF cannot be read, so failures never reach term extraction as text"""
+
+    def __init__(self, path, backend, cause):
+        self.path = path
+        self.backend = backend
+        self.cause = cause
+        super().__init__(f"{backend} could not extract text from {os.path.basename(path)}: {cause}")
+
+    def __reduce__(self):
+        # Raised inside worker processes; the cause travels as text in case it cannot be pickled
+        return (self.__class__, (self.path, self.backend, str(self.cause)))
+
+
+class PyPDF2Backend:
+    name = 'pypdf2'
+    available = True
+
+    def page_count(self, path):
+        with open(path, 'rb') as file:
+            return len(PyPDF2.PdfReader(file).pages)
+
+    def extract_pages(self, path, start, end):
+        with open(path, 'rb') as file:
+            reader = PyPDF2.PdfReader(file)
+            return [reader.pages[i].extract_text() or '' for i in range(start, end)]
+
+
+class PdfiumBackend:
+    name = 'pdfium'
+    available = pypdfium2 is not None
+
+    def page_count(self, path):
+        pdf = pypdfium2.PdfDocument(path)
+        try:
+            return len(pdf)
+        finally:
+            pdf.close()
+
+    def extract_pages(self, path, start, end):
+        pdf = pypdfium2.PdfDocument(path)
+        try:
+            pages = []
+            for i in range(start, end):
+                textpage = pdf[i].get_textpage()
+                pages.append(textpage.get_text_range().replace('\r\n', '\n'))
+                textpage.close()
+            return pages
+        finally:
+            pdf.close()
+
+
+class PyMuPDFBackend:
+    name = 'pymupdf'
+    available = pymupdf is not None
+
+    def page_count(self, path):
+        with pymupdf.open(path) as doc:
+            return doc.page_count
+
+    def extract_pages(self, path, start, end):
+        with pymupdf.open(path) as doc:
+            return [doc[i].get_text() for i in range(start, end)]
+
+
+BACKENDS = {backend.name: backend for backend in (PdfiumBackend(), PyMuPDFBackend(), PyPDF2Backend())}
+
+
+def available_backends():
+    return [backend for backend in BACKENDS.values() if backend.available]
+
+
+def benchmark_backends(sample_path, repeat=3, max_pages=5, time_limit=1.0):
+    """Best-of-N seconds to extract the first max_pages pages of sample_path with each available backend.
+
+    The sample may be a user's upload, so each backend gets at most time_limit
+    seconds of repeats; the first run always completes.
+    """
+    timings = {}
+    for backend in available_backends():
+        try:
+            pages = min(backend.page_count(sample_path), max_pages)
+            best = None
+            spent = 0.0
+            for _ in range(repeat):
+                start = time.perf_counter()
+                backend.extract_pages(sample_path, 0, pages)
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+                spent += elapsed
+                if spent >= time_limit:
+                    break
+            timings[backend.name] = best
+        except Exception:
+            # A backend that cannot read the sample is not a candidate
+            continue
+    return timings
+
+
+def find_sample_pdf(search_dirs=('sample_contracts', 'uploads')):
+    """A small PDF to benchmark on: the generated sample contracts first, then the smallest upload"""
+    for directory in search_dirs:
+        candidates = [
+            os.path.join(root, filename)
+            for root, _, files in os.walk(directory)
+            for filename in files if filename.lower().endswith('.pdf')
+        ]
+        if candidates:
+            return min(candidates, key=os.path.getsize)
+    return None
+
+
+def select_backend(preferred='auto', sample_path=None):
+    """Pick a backend by name, or by a startup micro-benchmark when preferred is 'auto'"""
+    if preferred != 'auto':
+        backend = BACKENDS.get(preferred)
+        if backend is None or not backend.available:
+            raise ValueError(f"PDF backend '{preferred}' is not installed")
+        return backend, {}
+
+    sample_path = sample_path or find_sample_pdf()
+    timings = benchmark_backends(sample_path) if sample_path else {}
+    if timings:
+        return BACKENDS[min(timings, key=timings.get)], timings
+
+    # Nothing to benchmark against: first available in order of expected speed
+    return available_backends()[0], {}
+
+
+def _extract_range(backend_name, path, start, end):
+    return BACKENDS[backend_name].extract_pages(path, start, end)
+
+
+class PDFTextExtractor:
+    """Extract text through the selected backend, splitting long documents across worker processes"""
+
+    def __init__(self, backend='auto', parallel_page_threshold=40, pages_per_task=20, max_workers=None, ocr=None):
+        self.backend, self.benchmark = select_backend(backend)
+        self.parallel_page_threshold = parallel_page_threshold
+        self.pages_per_task = pages_per_task
+        self.max_workers = max_workers
+        self.ocr = ocr
+
+    def _extract_text_layer(self, path):
+        page_count = self.backend.page_count(path)
+        if page_count < self.parallel_page_threshold:
+            return self.backend.extract_pages(path, 0, page_count)
+
+        ranges = [(start, min(start + self.pages_per_task, page_count))
+                  for start in range(0, page_count, self.pages_per_task)]
+        with ProcessPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = [pool.submit(_extract_range, self.backend.name, path, start, end) for start, end in ranges]
+            return [text for future in futures for text in future.result()]
+
+    def extract_pages(self, path):
+        """(text of each page in order, extraction stats); scanned pages are OCR'd when an OCR fallback
+        is configured. Stats are returned rather than stored, since one extractor serves concurrent uploads.
+        """
+        try:
+            pages = self._extract_text_layer(path)
+        except Exception as e:
+            raise PDFExtractionError(path, self.backend.name, e) from e
+
+        ocr_pages, cache_hits = [], 0
+        if self.ocr is not None:
+            try:
+                pages, ocr_pages, cache_hits = self.ocr.fill_missing_pages(path, pages)
+            except Exception as e:
+                # OCR is best effort; the pages stay empty and are reported below
+                print(f"OCR fallback failed for {os.path.basename(path)}: {str(e)}")
+
+        stats = {
+            'pages': len(pages),
+            'ocr_pages': ocr_pages,
+            'ocr_cache_hits': cache_hits,
+            'pages_without_text': [i for i, text in enumerate(pages) if not text.strip()]
+        }
+        return pages, stats
+
+    def extract_document(self, path):
+        """(text, extraction stats) for one PDF"""
+        pages, stats = self.extract_pages(path)
+        return '\n'.join(pages), stats
+
+    def extract_text(self, path):
+        return self.extract_document(path)[0]
+
+
+def extract_document(path, backend_name, ocr=None):
+    """Text and extraction stats for one PDF; module-level so it can run in a worker process"""
+    return PDFTextExtractor(backend_name, ocr=ocr).extract_document(path)
@@ -0,0 +1,229 @@
+import re
+import heapq
+import calendar
+import itertools
+import threading
+from collections import deque
+from datetime import date, datetime, timedelta
+
+# All patterns run on whitespace-normalised, lower-cased text (see AdvancedContractAnalyzer.normalize_text)
+DATE = r'([a-z]{3,9}\.? \d{1,2}, \d{4}|\d{4}-\d{2}-\d{2})'
+DATE_PATTERNS = {
+    'effective': re.compile(r'(?:entered into on|effective (?:date|as of|from)):? ' + DATE),
+    'expiry': re.compile(r'(?:expires? on|expiration date|expiry date|end date):? ' + DATE)
+}
+NUMBER_PATTERNS = {
+    'term_months': re.compile(r'(?:contract|initial) term:? (\d+)[ -]months?'),
+    'renewal_months': re.compile(r'renews? for (?:additional |successive )?(\d+)[ -]month'),
+    'notice_days': re.compile(r'(?:termination|non-renewal|cancellation) notice:? (\d+) days'),
+    'review_days': re.compile(r'renewal (?:deadline|review date|review):? (\d+) days prior'),
+    'escalation_pct': re.compile(
+        r'(?:price|fee|rate)s? (?:escalation|increase|uplift)s?:? (?:of |by )?(\d+(?:\.\d+)?) ?%'
+    )
+}
+AUTO_RENEWAL = re.compile(r'(?:auto|automatic)(?:ally)? ?renew')
+DATE_FORMATS = ('%B %d, %Y', '%b %d, %Y', '%b. %d, %Y', '%Y-%m-%d')
+
+
+def _parse_date(raw):
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(raw, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+def add_months(day, months):
+    month = day.month - 1 + months
+    year = day.year + month // 12
+    month = month % 12 + 1
+    return date(year, month, min(day.day, calendar.monthrange(year, month)[1]))
+
+
+def term_events(schedule, term_start, term_end):
+    """Expiry, notice, review and escalation dates for the term ending on term_end"""
+    events = [{'type': 'expiry', 'date': term_end}]
+    if schedule['notice_days']:
+        events.append({'type': 'notice_deadline', 'date': term_end - timedelta(days=schedule['notice_days'])})
+    if schedule['review_days']:
+        events.append({'type': 'renewal_review', 'date': term_end - timedelta(days=schedule['review_days'])})
+
+    # Escalations take effect on each anniversary of the effective date
+    if schedule['escalation_pct'] and schedule['effective_date']:
+        years = 1
+        anniversary = add_months(schedule['effective_date'], 12)
+        while anniversary <= term_end:
+            if anniversary > term_start:
+                events.append({'type': 'price_escalation', 'date': anniversary})
+            years += 1
+            anniversary = add_months(schedule['effective_date'], 12 * years)
+    return events
+
+
+def extract_renewal_schedule(text, today=None):
+    """Effective/expiry dates, renewal terms and the dated events of the current term"""
+    today = today or date.today()
+    schedule = {}
+    for name, pattern in DATE_PATTERNS.items():
+        match = pattern.search(text)
+        schedule[f'{name}_date'] = _parse_date(match.group(1)) if match else None
+    for name, pattern in NUMBER_PATTERNS.items():
+        match = pattern.search(text)
+        if match is None:
+            schedule[name] = None
+        else:
+            schedule[name] = float(match.group(1)) if name == 'escalation_pct' else int(match.group(1))
+
+    schedule['auto_renews'] = bool(AUTO_RENEWAL.search(text))
+    if schedule['auto_renews'] and not schedule['renewal_months']:
+        schedule['renewal_months'] = schedule['term_months']
+    if schedule['expiry_date'] is None and schedule['effective_date'] and schedule['term_months']:
+        schedule['expiry_date'] = add_months(schedule['effective_date'], schedule['term_months'])
+
+    expiry = schedule['expiry_date']
+    if expiry is None:
+        schedule['events'] = []
+        return schedule
+
+    term_start = schedule['effective_date'] or add_months(expiry, -(schedule['term_months'] or 12))
+    # An auto-renewing contract past its stated expiry is in a later term; alert on that one
+    if schedule['auto_renews'] and schedule['renewal_months']:
+        while expiry < today:
+            term_start, expiry = expiry, add_months(expiry, schedule['renewal_months'])
+    schedule['current_term_end'] = expiry
+    schedule['events'] = term_events(schedule, term_start, expiry)
+    return schedule
+
+
+class RenewalTimeline:
+    """Min-heap of contract date events keyed by the day their alert window opens.
+
+    Ingest threads add and remove contracts while the scheduler thread pops due
+    events, so every public method holds one lock; _push and _compact are only
+    called with it held.
+    """
+
+    def __init__(self, alert_days=30):
+        self.alert_days = alert_days
+        self.heap = []
+        self.schedules = {}
+        # Re-adding or removing a contract bumps its generation; older heap entries are skipped lazily
+        self.generations = {}
+        self.stale_entries = 0
+        self._sequence = itertools.count()
+        self._lock = threading.RLock()
+
+    def _push(self, contract_id, event):
+        alert_at = event['date'] - timedelta(days=self.alert_days)
+        heapq.heappush(self.heap, (alert_at, event['date'], next(self._sequence),
+                                   contract_id, self.generations[contract_id], event))
+
+    def add(self, contract_id, schedule):
+        with self._lock:
+            if contract_id in self.schedules:
+                self.stale_entries += len(self.schedules[contract_id]['events'])
+            self.generations[contract_id] = self.generations.get(contract_id, 0) + 1
+            self.schedules[contract_id] = schedule
+            for event in schedule['events']:
+                self._push(contract_id, event)
+            self._compact()
+
+    def remove(self, contract_id):
+        with self._lock:
+            schedule = self.schedules.pop(contract_id, None)
+            if schedule is not None:
+                self.stale_entries += len(schedule['events'])
+                self.generations[contract_id] += 1
+                self._compact()
+
+    def _compact(self):
+        if self.stale_entries > len(self.heap) // 2:
+            self.heap = [entry for entry in self.heap if self.generations.get(entry[3]) == entry[4]]
+            heapq.heapify(self.heap)
+            self.stale_entries = 0
+
+    def pop_due(self, today):
+        """Remove and return (contract_id, event) for every event whose alert window has opened"""
+        due = []
+        with self._lock:
+            while self.heap and self.heap[0][0] <= today:
+                _, _, _, contract_id, generation, event = heapq.heappop(self.heap)
+                if self.generations.get(contract_id) == generation:
+                    due.append((contract_id, event))
+                else:
+                    self.stale_entries -= 1
+        return due
+
+    def advance_term(self, contract_id, expiry_date=None):
+        """Schedule the next term's events once an auto-renewing contract's expiry alert fires.
+
+        expiry_date is the popped expiry event's date; if the contract was re-added
+        since, its schedule has a different term end and is left alone.
+        """
+        with self._lock:
+            schedule = self.schedules.get(contract_id)
+            if not schedule or not schedule['auto_renews'] or not schedule['renewal_months']:
+                return
+            if expiry_date is not None and schedule['current_term_end'] != expiry_date:
+                return
+            term_start = schedule['current_term_end']
+            schedule['current_term_end'] = add_months(term_start, schedule['renewal_months'])
+            events = term_events(schedule, term_start, schedule['current_term_end'])
+            schedule['events'] = events
+            for event in events:
+                self._push(contract_id, event)
+
+    def upcoming(self, today, days):
+        """Scheduled events dated within the next `days` days, soonest first"""
+        horizon = today + timedelta(days=days)
+        with self._lock:
+            events = [
+                dict(event, contract=contract_id, days_remaining=(event['date'] - today).days)
+                for contract_id, schedule in self.schedules.items()
+                for event in schedule['events']
+                if today <= event['date'] <= horizon
+            ]
+        return sorted(events, key=lambda e: e['date'])
+
+
+class RenewalScheduler:
+    """Each tick evaluates only the contracts whose alert window opened since the last tick"""
+
+    def __init__(self, timeline, evaluate, max_alerts=1000):
+        self.timeline = timeline
+        self.evaluate = evaluate
+        self.alerts = deque(maxlen=max_alerts)
+        self.last_tick = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def tick(self, today=None):
+        today = today or date.today()
+        new_alerts = []
+        with self._lock:
+            for contract_id, event in self.timeline.pop_due(today):
+                alert = self.evaluate(contract_id, event, today)
+                if alert:
+                    new_alerts.append(alert)
+                    self.alerts.append(alert)
+                if event['type'] == 'expiry':
+                    self.timeline.advance_term(contract_id, event['date'])
+            self.last_tick = datetime.now().isoformat()
+        return new_alerts
+
+    def start(self, interval_seconds):
+        if self._thread is not None:
+            return
+        def run():
+            while not self._stop.wait(interval_seconds):
+                try:
+                    self.tick()
+                except Exception as e:
+                    print(f"Renewal scheduler tick failed: {str(e)}")
+        self._thread = threading.Thread(target=run, name='renewal-scheduler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
@@ -0,0 +1,248 @@
+import os
+import re
+import json
+import shutil
+import threading
+from xml.sax.saxutils import escape
+from concurrent.futures import ProcessPoolExecutor
+
+EXPORT_FORMATS = {
+    'pdf': 'application/pdf',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+}
+
+
+def analysis_version(results):
+    """Export cache key for one analysis run, derived from its timestamp"""
+    return re.sub(r'[^0-9A-Za-z]', '', results.get('analysis_date', 'unversioned'))
+
+
+def _issue_rows(issues):
+    return [[issue['type'], issue['severity'], issue['risk_score'], issue['estimated_impact'], issue['description']]
+            for issue in issues]
+
+
+def report_sections(results, contract_id=None):
+    """Title and (heading, paragraphs, table) sections shared by every export format"""
+    report = results['compliance_report']
+    issue_header = ['Issue', 'Severity', 'Risk Score', 'Estimated Impact', 'Description']
+
+    if contract_id is not None:
+        analysis = report['contract_analysis'][contract_id]
+        return {
+            'title': f'Contract Leakage Report: {contract_id}',
+            'subtitle': f"Analysis date: {results['analysis_date']}",
+            'sections': [
+                {
+                    'heading': 'Risk Assessment',
+                    'paragraphs': [],
+                    'table': [['Risk Level', 'Risk Score', 'Estimated Savings', 'Issues'],
+                              [analysis['risk_level'], analysis['risk_score'],
+                               f"${analysis['estimated_savings']:,}", len(analysis['leakage_issues'])]]
+                },
+                {
+                    'heading': 'Leakage Issues',
+                    'paragraphs': [] if analysis['leakage_issues'] else ['No leakage issues detected.'],
+                    'table': [issue_header] + _issue_rows(analysis['leakage_issues'])
+                }
+            ]
+        }
+
+    summary = report['summary']
+    contracts = sorted(report['contract_analysis'].items(), key=lambda item: item[1]['risk_score'], reverse=True)
+    sections = [
+        {
+            'heading': 'Summary',
+            'paragraphs': [],
+            'table': [['Metric', 'Value'],
+                      ['Contracts analysed', summary['total_contracts']],
+                      ['High risk contracts', summary['high_risk_contracts']],
+                      ['Medium risk contracts', summary['medium_risk_contracts']],
+                      ['Low risk contracts', summary['low_risk_contracts']],
+                      ['Estimated savings', f"${summary['total_estimated_savings']:,}"],
+                      ['Annual margin gap', f"${summary.get('annual_margin_gap', 0):,.0f}"]]
+        },
+        {
+            'heading': 'Recommendations',
+            'paragraphs': [f"[{r['priority']}] {r['action']}: {r['description']}" for r in report['recommendations']]
+                          or ['No recommendations.'],
+            'table': None
+        },
+        {
+            'heading': 'Contracts',
+            'paragraphs': [],
+            'table': [['Contract', 'Risk Level', 'Risk Score', 'Estimated Savings', 'Issues']] + [
+                [contract, analysis['risk_level'], analysis['risk_score'],
+                 f"${analysis['estimated_savings']:,}", len(analysis['leakage_issues'])]
+                for contract, analysis in contracts
+            ]
+        }
+    ]
+    for contract, analysis in contracts:
+        if analysis['leakage_issues']:
+            sections.append({
+                'heading': f'Issues: {contract}',
+                'paragraphs': [],
+                'table': [issue_header] + _issue_rows(analysis['leakage_issues'])
+            })
+    return {
+        'title': 'Contract Leakage Compliance Report',
+        'subtitle': f"Analysis date: {results['analysis_date']}",
+        'sections': sections
+    }
+
+
+def write_pdf(document, path):
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import letter, landscape
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.lib.units import inch
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+
+    styles = getSampleStyleSheet()
+    cell = styles['BodyText']
+    # Paragraph parses markup, so contract names and descriptions are escaped
+    story = [Paragraph(escape(document['title']), styles['Title']),
+             Paragraph(escape(document['subtitle']), styles['Italic'])]
+    for section in document['sections']:
+        story.append(Spacer(1, 0.2 * inch))
+        story.append(Paragraph(escape(section['heading']), styles['Heading2']))
+        for paragraph in section['paragraphs']:
+            story.append(Paragraph(escape(paragraph), styles['Normal']))
+        if section['table'] and len(section['table']) > 1:
+            rows = [[Paragraph(escape(str(value)), cell) for value in row] for row in section['table']]
+            table = Table(rows, repeatRows=1)
+            table.setStyle(TableStyle([
+                ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
+                ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+                ('VALIGN', (0, 0), (-1, -1), 'TOP')
+            ]))
+            story.append(table)
+    # Flowables are laid out page by page straight into the output file
+    SimpleDocTemplate(path, pagesize=landscape(letter), leftMargin=0.5 * inch, rightMargin=0.5 * inch,
+                      title=document['title']).build(story)
+
+
+def write_xlsx(document, path):
+    from openpyxl import Workbook
+
+    # Write-only mode streams rows to disk instead of holding the workbook in memory
+    workbook = Workbook(write_only=True)
+    used_titles = set()
+    for section in document['sections']:
+        title = re.sub(r'[\[\]:*?/\\]', '', section['heading'])[:28]
+        while title in used_titles:
+            title = f"{title[:26]}_{len(used_titles)}"
+        used_titles.add(title)
+        sheet = workbook.create_sheet(title)
+        for paragraph in section['paragraphs']:
+            sheet.append([paragraph])
+        for row in section['table'] or []:
+            sheet.append(row)
+    workbook.save(path)
+
+
+def write_docx(document, path):
+    from docx import Document
+
+    doc = Document()
+    doc.add_heading(document['title'], 0)
+    doc.add_paragraph().add_run(document['subtitle']).italic = True
+    for section in document['sections']:
+        doc.add_heading(section['heading'], level=1)
+        for paragraph in section['paragraphs']:
+            doc.add_paragraph(paragraph)
+        if section['table'] and len(section['table']) > 1:
+            table = doc.add_table(rows=0, cols=len(section['table'][0]))
+            table.style = 'Light Grid Accent 1'
+            for row in section['table']:
+                cells = table.add_row().cells
+                for i, value in enumerate(row):
+                    cells[i].text = str(value)
+    doc.save(path)
+
+
+WRITERS = {'pdf': write_pdf, 'xlsx': write_xlsx, 'docx': write_docx}
+
+
+def render_export(results_path, version, fmt, contract_id, path):
+    """Render one export in a worker process; written to a temp file and renamed into place"""
+    with open(results_path, 'r') as f:
+        results = json.load(f)
+    if analysis_version(results) != version:
+        raise RuntimeError('Analysis changed while the export was queued')
+
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    try:
+        WRITERS[fmt](report_sections(results, contract_id), tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return path
+
+
+class ReportExporter:
+    """Renders exports in background worker processes and keeps them on disk per analysis version"""
+
+    def __init__(self, results_path='analysis_results/latest_analysis.json',
+                 export_dir='analysis_results/exports', max_workers=2):
+        self.results_path = results_path
+        self.export_dir = export_dir
+        self.max_workers = max_workers
+        self.jobs = {}
+        self.errors = {}
+        self._latest = None
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def export_path(self, version, fmt, contract_id=None):
+        name = 'portfolio' if contract_id is None else 'contract_' + re.sub(r'[^0-9A-Za-z._-]', '_', contract_id)
+        return os.path.join(self.export_dir, version, f'{name}.{fmt}')
+
+    def _prune(self, version):
+        """Exports from earlier analyses are never served again"""
+        for entry in os.listdir(self.export_dir):
+            if entry != version:
+                shutil.rmtree(os.path.join(self.export_dir, entry), ignore_errors=True)
+
+    def latest_analysis(self):
+        """Version and contract ids of the saved analysis; the JSON is re-read only when the file changes"""
+        mtime = os.stat(self.results_path).st_mtime_ns
+        if self._latest is None or self._latest[0] != mtime:
+            with open(self.results_path, 'r') as f:
+                results = json.load(f)
+            self._latest = (mtime, analysis_version(results), set(results['compliance_report']['contract_analysis']))
+        return self._latest[1], self._latest[2]
+
+    def request(self, fmt, contract_id=None):
+        """('ready', path) from the cache, or start/continue a background render: ('rendering'|'failed', detail).
+        Raises FileNotFoundError before any analysis and KeyError for an unknown contract.
+        """
+        version, contract_ids = self.latest_analysis()
+        if contract_id is not None and contract_id not in contract_ids:
+            raise KeyError(contract_id)
+        path = self.export_path(version, fmt, contract_id)
+        if os.path.exists(path):
+            return 'ready', path
+
+        key = (version, fmt, contract_id)
+        with self._lock:
+            if key in self.errors:
+                return 'failed', self.errors.pop(key)
+            if key not in self.jobs:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                self._prune(version)
+                if self._pool is None:
+                    self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+                future = self._pool.submit(render_export, self.results_path, version, fmt, contract_id, path)
+                future.add_done_callback(lambda done: self._finished(key, done))
+                self.jobs[key] = future
+        return 'rendering', None
+
+    def _finished(self, key, future):
+        with self._lock:
+            self.jobs.pop(key, None)
+            if future.exception() is not None:
+                self.errors[key] = str(future.exception())
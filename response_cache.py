@@ -0,0 +1,61 @@
+import threading
+from collections import OrderedDict
+
+
+class ResponseCache:
+    """LRU cache of encoded response bodies.
+
+    Keys carry the corpus (or analysis) version they were computed from, so a
+    change never needs an explicit purge: requests after it simply miss, and
+    entries for old versions fall off the end as new ones are added.
+
+    A miss is counted per body built and stored, not per failed lookup, so
+    callers that wait on a shared build do not inflate it.
+    """
+
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            body = self.entries.get(key)
+            if body is None:
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return body
+
+    def put(self, key, body):
+        """Store a freshly built body; counts as one miss"""
+        with self._lock:
+            self.misses += 1
+            if self.max_entries <= 0:
+                return body
+            self.entries[key] = body
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+        return body
+
+    def get_or_build(self, key, build):
+        """Cached body for key, or build() it and cache the result"""
+        body = self.get(key)
+        if body is None:
+            body = self.put(key, build())
+        return body
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self.entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions
+            }
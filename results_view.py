@@ -0,0 +1,109 @@
+import os
+import json
+import math
+
+SORT_KEYS = ('risk_score', 'estimated_savings', 'issues', 'contract')
+
+
+def contract_group(contract_id):
+    """'azure' or 'customer', matching how /analyze splits leakage issues"""
+    if 'azure' in contract_id:
+        return 'azure'
+    if 'customer' in contract_id:
+        return 'customer'
+    return 'other'
+
+
+class ResultsView:
+    """Summary, sorted contract pages and per-contract findings from the saved analysis.
+
+    The JSON is parsed once per analysis (re-read when the file changes) and
+    reduced to one small row per contract, so the results page never has to
+    ship every leakage issue up front.
+    """
+
+    def __init__(self, path='analysis_results/latest_analysis.json'):
+        self.path = path
+        self.mtime = None
+        self.results = None
+        self.rows = []
+
+    def load(self):
+        """Parsed results, or None before the first analysis"""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+        if mtime != self.mtime:
+            with open(self.path, 'r') as f:
+                results = json.load(f)
+            self.rows = [
+                {
+                    'contract': contract_id,
+                    'group': contract_group(contract_id),
+                    'risk_level': analysis['risk_level'],
+                    'risk_score': analysis['risk_score'],
+                    'estimated_savings': analysis['estimated_savings'],
+                    'issues': len(analysis['leakage_issues'])
+                }
+                for contract_id, analysis in results['compliance_report']['contract_analysis'].items()
+            ]
+            self.results, self.mtime = results, mtime
+        return self.results
+
+    def summary(self):
+        """Headline figures for the results page, without per-contract findings"""
+        results = self.load()
+        if results is None:
+            return None
+        report = results['compliance_report']
+        issue_counts = {'azure': 0, 'customer': 0, 'other': 0}
+        for row in self.rows:
+            issue_counts[row['group']] += row['issues']
+        return {
+            'total_contracts': results['total_contracts'],
+            'model_trained': results['model_trained'],
+            'knowledge_graph_nodes': results['knowledge_graph_nodes'],
+            'knowledge_graph_edges': results['knowledge_graph_edges'],
+            'analysis_date': results['analysis_date'],
+            'azure_issue_count': issue_counts['azure'],
+            'customer_issue_count': issue_counts['customer'],
+            'issue_count': sum(issue_counts.values()),
+            'report_summary': report['summary'],
+            'recommendations': report['recommendations']
+        }
+
+    def contract_page(self, group=None, sort='risk_score', order='desc', page=1, per_page=25):
+        """One page of contract rows sorted server-side; raises ValueError for an unknown sort key"""
+        if sort not in SORT_KEYS:
+            raise ValueError(f"Unknown sort key '{sort}'; use one of {', '.join(SORT_KEYS)}")
+        if self.load() is None:
+            return None
+
+        rows = [row for row in self.rows if group is None or row['group'] == group]
+        # Contract name breaks ties so pages are stable
+        rows.sort(key=lambda row: row['contract'])
+        rows.sort(key=lambda row: row[sort], reverse=(order == 'desc'))
+
+        per_page = max(1, min(per_page, 200))
+        pages = max(1, math.ceil(len(rows) / per_page))
+        page = min(max(1, page), pages)
+        return {
+            'total': len(rows),
+            'page': page,
+            'pages': pages,
+            'per_page': per_page,
+            'sort': sort,
+            'order': order,
+            'contracts': rows[(page - 1) * per_page:page * per_page]
+        }
+
+    def contract_detail(self, contract_id):
+        """Risk assessment and every leakage issue for one contract, or None if it was not analysed"""
+        results = self.load()
+        if results is None:
+            return None
+        analysis = results['compliance_report']['contract_analysis'].get(contract_id)
+        if analysis is None:
+            return None
+        return dict(analysis, contract=contract_id, group=contract_group(contract_id))
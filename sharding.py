@@ -0,0 +1,121 @@
+import os
+import sys
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor
+import networkx as nx
+
+
+def shard_key(contract_id, metadata):
+    """Counterparty shard, e.g. 'azure-nadcomms' or 'nadcomms-customerB'"""
+    return metadata.get('contract_type') or contract_id.split('_', 1)[0]
+
+
+def partition_contracts(contracts):
+    """Group contracts by counterparty; payloads carry terms and metadata but not full text"""
+    shards = {}
+    for contract_id, contract_data in contracts.items():
+        shard = shards.setdefault(shard_key(contract_id, contract_data['metadata']), {})
+        shard[contract_id] = {
+            'terms': contract_data['terms'],
+            'metadata': contract_data['metadata']
+        }
+    return shards
+
+
+def analyze_shard(shard_name, contracts):
+    """Per-shard leakage analysis and knowledge subgraph; runs in any process or on any node"""
+    from contract_analyzer import AdvancedContractAnalyzer
+
+    start_time = time.perf_counter()
+    analyzer = AdvancedContractAnalyzer()
+    analyzer.contracts = {
+        contract_id: dict(contract_data, text='') for contract_id, contract_data in contracts.items()
+    }
+    analyzer.build_enhanced_knowledge_graph()
+
+    contract_analysis = {
+        contract_id: analyzer.assess_contract(contract_id, contract_data['terms'])
+        for contract_id, contract_data in contracts.items()
+    }
+    return {
+        'shard': shard_name,
+        'contract_analysis': contract_analysis,
+        'knowledge_graph': nx.node_link_data(analyzer.knowledge_graph),
+        'elapsed_seconds': time.perf_counter() - start_time
+    }
+
+
+class ShardCoordinator:
+    """Fan per-counterparty analysis out to worker processes and merge it into one compliance report.
+
+    mode='process' uses a local process pool as a stand-in for separate nodes;
+    mode='inline' runs every shard in the calling process. For real multi-node
+    runs, write_shard_payloads() and merge() bracket `python sharding.py run`
+    executed on each node.
+    """
+
+    def __init__(self, analyzer, mode='process', max_workers=None):
+        self.analyzer = analyzer
+        self.mode = mode
+        self.max_workers = max_workers
+
+    def run(self):
+        shards = partition_contracts(self.analyzer.contracts)
+        if self.mode == 'process' and len(shards) > 1:
+            with ProcessPoolExecutor(max_workers=self.max_workers) as pool:
+                futures = [pool.submit(analyze_shard, name, contracts) for name, contracts in shards.items()]
+                results = [future.result() for future in futures]
+        else:
+            results = [analyze_shard(name, contracts) for name, contracts in shards.items()]
+        return self.merge(results)
+
+    def merge(self, results):
+        """Combine shard findings and subgraphs into the portfolio compliance report"""
+        contract_analysis = {}
+        graphs = []
+        for result in results:
+            contract_analysis.update(result['contract_analysis'])
+            graphs.append(nx.node_link_graph(result['knowledge_graph']))
+
+        # Keep the portfolio-wide graph in step with what single-process analysis would build
+        self.analyzer.knowledge_graph = nx.compose_all(graphs) if graphs else nx.Graph()
+        self.analyzer.contract_assessments.update(contract_analysis)
+        self.analyzer.pending_analysis.clear()
+        report = self.analyzer.build_compliance_report(contract_analysis)
+        report['shards'] = {
+            result['shard']: {
+                'contracts': len(result['contract_analysis']),
+                'elapsed_seconds': result['elapsed_seconds']
+            }
+            for result in results
+        }
+        return report
+
+    def write_shard_payloads(self, directory):
+        """One JSON payload per shard for dispatch to other nodes"""
+        os.makedirs(directory, exist_ok=True)
+        paths = []
+        for name, contracts in partition_contracts(self.analyzer.contracts).items():
+            path = os.path.join(directory, f'{name}.json')
+            with open(path, 'w') as f:
+                json.dump({'shard': name, 'contracts': contracts}, f)
+            paths.append(path)
+        return paths
+
+
+def main():
+    # Node entry point: python sharding.py run <payload.json> <result.json>
+    if len(sys.argv) != 4 or sys.argv[1] != 'run':
+        print("Usage: python sharding.py run <payload.json> <result.json>")
+        sys.exit(1)
+
+    with open(sys.argv[2], 'r') as f:
+        payload = json.load(f)
+    result = analyze_shard(payload['shard'], payload['contracts'])
+    with open(sys.argv[3], 'w') as f:
+        json.dump(result, f)
+
+
+if __name__ == '__main__':
+    main()
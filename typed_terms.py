@@ -0,0 +1,136 @@
+import re
+import pandas as pd
+
+# All patterns run on whitespace-normalised, lower-cased text (see AdvancedContractAnalyzer.normalize_text)
+TYPED_PATTERNS = {
+    'amount': re.compile(
+        r'\$ ?(\d[\d,]*(?:\.\d+)?)(?: ?(?:per|/) ?(?:additional )?(month|year|annum|user|license|instance|hour|day)\b)?'
+    ),
+    'percentage': re.compile(r'(\d+(?:\.\d+)?) ?%'),
+    'storage': re.compile(r'(\d+(?:\.\d+)?) ?(tb|gb|mb)\b( ram| memory)?'),
+    'vcpu': re.compile(r'(\d+) ?(?:vcpus?|cpu cores?)\b'),
+    'users': re.compile(r'(\d[\d,]*) (?:named |concurrent |additional )?users?\b'),
+    'duration': re.compile(r'(\d+)[ -](hours?|days?|weeks?|months?|years?)\b'),
+    # "50 standard d4s v3 (4 vcpu, 16 gb ram each)" -> 50 instances of 4 vCPU / 16 GB
+    'instances': re.compile(r'(\d+) (?:[\w.]+ ){0,4}\((\d+) vcpu, (\d+) gb ram each\)')
+}
+
+STORAGE_TO_GB = {'mb': 1 / 1024, 'gb': 1, 'tb': 1024}
+DURATION_TO_DAYS = {'hour': 1 / 24, 'day': 1, 'week': 7, 'month': 30, 'year': 365}
+PERIOD_TO_MONTHLY = {'month': 1, 'year': 1 / 12, 'annum': 1 / 12}
+
+COLUMNS = ['contract', 'kind', 'value', 'unit', 'period', 'normalized_value', 'normalized_unit',
+           'start', 'end', 'context']
+
+
+def _number(raw):
+    return float(raw.replace(',', ''))
+
+
+def extract_typed_terms(text):
+    """Parse amounts, percentages, capacities, user counts and durations into numeric records"""
+    records = []
+
+    def add(kind, match, value, unit, normalized_value, normalized_unit, period=None):
+        records.append({
+            'kind': kind,
+            'value': value,
+            'unit': unit,
+            'period': period,
+            'normalized_value': normalized_value,
+            'normalized_unit': normalized_unit,
+            'start': match.start(),
+            'end': match.end(),
+            'context': text[max(0, match.start() - 40):match.start()].strip()
+        })
+
+    for match in TYPED_PATTERNS['amount'].finditer(text):
+        value = _number(match.group(1))
+        period = match.group(2)
+        if period in PERIOD_TO_MONTHLY:
+            add('amount', match, value, 'USD', value * PERIOD_TO_MONTHLY[period], 'USD/month', period)
+        else:
+            add('amount', match, value, 'USD', value, f'USD/{period}' if period else 'USD', period)
+
+    for match in TYPED_PATTERNS['percentage'].finditer(text):
+        value = float(match.group(1))
+        add('percentage', match, value, '%', value / 100, 'ratio')
+
+    for match in TYPED_PATTERNS['storage'].finditer(text):
+        value = float(match.group(1))
+        unit = match.group(2)
+        kind = 'memory' if match.group(3) else 'storage'
+        add(kind, match, value, unit.upper(), value * STORAGE_TO_GB[unit], 'GB')
+
+    for match in TYPED_PATTERNS['vcpu'].finditer(text):
+        value = float(match.group(1))
+        add('vcpu', match, value, 'vCPU', value, 'vCPU')
+
+    for match in TYPED_PATTERNS['users'].finditer(text):
+        value = _number(match.group(1))
+        add('users', match, value, 'users', value, 'users')
+
+    for match in TYPED_PATTERNS['duration'].finditer(text):
+        value = float(match.group(1))
+        unit = match.group(2).rstrip('s')
+        add('duration', match, value, unit, value * DURATION_TO_DAYS[unit], 'days')
+
+    for match in TYPED_PATTERNS['instances'].finditer(text):
+        count, vcpu, ram = (float(g) for g in match.groups())
+        add('total_vcpu', match, count, 'instances', count * vcpu, 'vCPU')
+        add('total_ram', match, count, 'instances', count * ram, 'GB')
+
+    return records
+
+
+class TypedTermTable:
+    """Columnar store of typed terms for every contract, exposed as a pandas DataFrame"""
+
+    def __init__(self):
+        self.columns = {column: [] for column in COLUMNS}
+        self._frame = None
+
+    def add(self, contract_id, records):
+        self.remove(contract_id)
+        for record in records:
+            self.columns['contract'].append(contract_id)
+            for column in COLUMNS[1:]:
+                self.columns[column].append(record[column])
+        self._frame = None
+
+    def remove(self, contract_id):
+        keep = [i for i, cid in enumerate(self.columns['contract']) if cid != contract_id]
+        if len(keep) != len(self.columns['contract']):
+            self.columns = {column: [values[i] for i in keep] for column, values in self.columns.items()}
+            self._frame = None
+
+    def frame(self):
+        """DataFrame view, rebuilt only after the table changes"""
+        if self._frame is None:
+            self._frame = pd.DataFrame(self.columns, columns=COLUMNS)
+        return self._frame
+
+    def contract_metrics(self):
+        """One row per contract with the headline numeric terms used by quantitative rules"""
+        df = self.frame()
+        if df.empty:
+            return pd.DataFrame(columns=['monthly_fee', 'total_vcpu', 'total_ram_gb', 'storage_gb',
+                                         'licensed_users', 'per_user_fee', 'uptime_pct',
+                                         'cost_per_vcpu'])
+
+        amounts = df[df['kind'] == 'amount']
+        monthly = amounts[amounts['normalized_unit'] == 'USD/month']
+        per_user = amounts[amounts['normalized_unit'] == 'USD/user']
+        uptime = df[(df['kind'] == 'percentage') & df['context'].str.contains('uptime|availability')]
+
+        metrics = pd.DataFrame(index=pd.Index(df['contract'].unique(), name='contract'))
+        metrics['monthly_fee'] = monthly.groupby('contract')['normalized_value'].max()
+        metrics['total_vcpu'] = df[df['kind'] == 'total_vcpu'].groupby('contract')['normalized_value'].sum()
+        metrics['total_ram_gb'] = df[df['kind'] == 'total_ram'].groupby('contract')['normalized_value'].sum()
+        metrics['storage_gb'] = df[df['kind'] == 'storage'].groupby('contract')['normalized_value'].max()
+        # The first user count is the licensed seat count; later ones are tier boundaries
+        metrics['licensed_users'] = df[df['kind'] == 'users'].groupby('contract')['normalized_value'].first()
+        metrics['per_user_fee'] = per_user.groupby('contract')['normalized_value'].min()
+        metrics['uptime_pct'] = uptime.groupby('contract')['value'].max()
+        metrics['cost_per_vcpu'] = metrics['monthly_fee'] / metrics['total_vcpu']
+        return metrics
@@ -0,0 +1,152 @@
+import os
+import time
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    from inotify_simple import INotify, flags
+except ImportError:
+    INotify = None
+
+INOTIFY_AVAILABLE = INotify is not None
+
+
+def scan_pdfs(folders):
+    """(mtime_ns, size) of every PDF directly inside the watched folders"""
+    snapshot = {}
+    for folder in folders:
+        try:
+            entries = list(os.scandir(folder))
+        except FileNotFoundError:
+            continue
+        for entry in entries:
+            if entry.is_file() and entry.name.lower().endswith('.pdf'):
+                stat = entry.stat()
+                snapshot[entry.path] = (stat.st_mtime_ns, stat.st_size)
+    return snapshot
+
+
+class UploadWatcher:
+    """Watch the per-counterparty upload folders and pass settled PDF changes to a handler.
+
+    Changes are collected per path and only handed over once a path has been
+    quiet for debounce_seconds, so an export that writes many files (or one
+    file in several writes) becomes a single batch. The handler receives the
+    changed paths and a process pool for text extraction; a path that no
+    longer exists was deleted.
+    """
+
+    def __init__(self, folders, handle_batch, debounce_seconds=2.0, poll_interval=5.0,
+                 max_workers=2, backend='auto', initial_scan=True):
+        self.folders = list(folders)
+        self.handle_batch = handle_batch
+        self.debounce_seconds = debounce_seconds
+        self.poll_interval = poll_interval
+        self.max_workers = max_workers
+        if backend == 'auto':
+            backend = 'inotify' if INOTIFY_AVAILABLE else 'polling'
+        self.backend = backend
+        self.initial_scan = initial_scan
+        self.pending = {}
+        self.batches = 0
+        self.last_batch = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.pool = None
+
+    def _mark(self, path):
+        with self._lock:
+            self.pending[path] = time.monotonic()
+
+    def _flush(self):
+        """Hand paths that have been quiet for the debounce interval to the handler"""
+        now = time.monotonic()
+        with self._lock:
+            settled = [path for path, seen in self.pending.items() if now - seen >= self.debounce_seconds]
+            for path in settled:
+                del self.pending[path]
+        if not settled:
+            return
+
+        start_time = time.perf_counter()
+        try:
+            result = self.handle_batch(sorted(settled), self.pool)
+        except Exception as e:
+            print(f"Upload watcher batch failed: {str(e)}")
+            result = {'error': str(e)}
+        self.batches += 1
+        self.last_batch = {
+            'paths': len(settled),
+            'elapsed_seconds': time.perf_counter() - start_time,
+            'result': result
+        }
+
+    def _poll_loop(self):
+        snapshot = {} if self.initial_scan else scan_pdfs(self.folders)
+        while not self._stop.is_set():
+            current = scan_pdfs(self.folders)
+            for path in current.keys() | snapshot.keys():
+                if current.get(path) != snapshot.get(path):
+                    self._mark(path)
+            snapshot = current
+            self._flush()
+            self._stop.wait(min(self.poll_interval, self.debounce_seconds))
+
+    def _inotify_loop(self):
+        inotify = INotify()
+        mask = flags.CLOSE_WRITE | flags.MOVED_TO | flags.DELETE | flags.MOVED_FROM
+        watches = {inotify.add_watch(folder, mask): folder for folder in self.folders if os.path.isdir(folder)}
+        if self.initial_scan:
+            for path in scan_pdfs(self.folders):
+                self._mark(path)
+        try:
+            while not self._stop.is_set():
+                for event in inotify.read(timeout=int(self.debounce_seconds * 1000)):
+                    if event.name.lower().endswith('.pdf') and event.wd in watches:
+                        self._mark(os.path.join(watches[event.wd], event.name))
+                self._flush()
+        finally:
+            inotify.close()
+
+    def run(self):
+        self.pool = ProcessPoolExecutor(max_workers=self.max_workers)
+        try:
+            if self.backend == 'inotify':
+                self._inotify_loop()
+            else:
+                self._poll_loop()
+        finally:
+            self.pool.shutdown()
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self.run, name='upload-watcher', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def status(self):
+        with self._lock:
+            pending = len(self.pending)
+        return {
+            'backend': self.backend,
+            'running': self._thread is not None and self._thread.is_alive(),
+            'folders': self.folders,
+            'pending_paths': pending,
+            'batches': self.batches,
+            'last_batch': self.last_batch
+        }
+
+
+def main():
+    # Ingestion daemon: serve the API with the upload folders watched in-process,
+    # so contracts exported into uploads/ are analysed without the browser form
+    from app import app, start_upload_watcher
+    start_upload_watcher()
+    app.run(host='0.0.0.0', port=int(os.environ.get('PORT', 5000)), use_reloader=False)
+
+
+if __name__ == '__main__':
+    main()